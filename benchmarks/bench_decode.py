@@ -0,0 +1,63 @@
+# coding:utf-8
+"""Measure the decode throughput of the query response codecs.
+
+Usage: python benchmarks/bench_decode.py [rows] [series]
+"""
+
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from influxtor.codec import _JSON_BACKENDS, CSVCodec, JSONCodec
+
+
+def make_response(rows, series):
+    per_series = rows // series
+    return {'results': [{'statement_id': 0, 'series': [{
+        'name': 'cpu_load',
+        'tags': {'host': 'server%03d' % s},
+        'columns': ['time', 'value', 'count', 'status'],
+        'values': [[1500000000000000000 + i, i * 0.5, i, 'ok']
+                   for i in range(per_series)],
+    } for s in range(series)]}]}
+
+
+def make_csv(response):
+    lines = ['name,tags,time,value,count,status']
+    for series in response['results'][0]['series']:
+        tags = 'host=%s' % series['tags']['host']
+        for values in series['values']:
+            lines.append('%s,%s,%s' % (series['name'], tags,
+                                       ','.join(repr(v) if isinstance(
+                                           v, float) else str(v)
+                                           for v in values)))
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+def bench(name, func, size, rows, repeat=5):
+    best = min(timeit.repeat(func, number=1, repeat=repeat))
+    print("%-12s %8.2f ms %8.1f MB/s %10.0f rows/s" % (
+        name, best * 1000, size / best / 1e6, rows / best))
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    series = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    response = make_response(rows, series)
+    body = json.dumps(response).encode('utf-8')
+    csv_body = make_csv(response)
+
+    print("%d rows, %d series; json %d bytes, csv %d bytes" % (
+        rows, series, len(body), len(csv_body)))
+    for backend in sorted(_JSON_BACKENDS):
+        codec = JSONCodec(backend)
+        bench(backend, lambda: codec.loads(body), len(body), rows)
+    csv_codec = CSVCodec()
+    bench('csv', lambda: csv_codec.loads(csv_body), len(csv_body), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+# coding:utf-8
+"""Compare influxtor's line protocol encoder with influxdb.line_protocol.
+
+Usage: python benchmarks/bench_line_protocol.py [points] [series]
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from influxdb.line_protocol import make_lines as influxdb_make_lines
+
+from influxtor.line_protocol import LineProtocolEncoder
+
+
+def make_points(count, series):
+    return {
+        'tags': {'region': 'us-west'},
+        'points': [{
+            'measurement': 'cpu_load',
+            'tags': {'host': 'server%03d' % (i % series), 'core': str(i % 4)},
+            'time': 1500000000000000000 + i,
+            'fields': {'value': i * 0.5, 'count': i, 'ok': True},
+        } for i in range(count)],
+    }
+
+
+def bench(name, func, repeat=5):
+    best = min(timeit.repeat(func, number=1, repeat=repeat))
+    print("%-24s %8.2f ms" % (name, best * 1000))
+    return best
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    series = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    data = make_points(count, series)
+    encoder = LineProtocolEncoder()
+
+    expected = influxdb_make_lines(data).encode('utf-8')
+    if encoder.make_lines(data) != expected:
+        raise SystemExit("output differs from influxdb.line_protocol")
+
+    print("%d points, %d series" % (count, series))
+    baseline = bench("influxdb.make_lines",
+                     lambda: influxdb_make_lines(data).encode('utf-8'))
+    fast = bench("influxtor.make_lines", lambda: encoder.make_lines(data))
+    print("speedup: %.1fx" % (baseline / fast))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+# coding:utf-8
+"""Measure the client's per-call overhead, without any network.
+
+The HTTP client is replaced by one answering every request at once, so
+the timings are the cost of the client's own code: building requests,
+encoding, decoding and its coroutines.
+
+Usage: python benchmarks/bench_overhead.py [calls]
+"""
+
+import json
+import os
+import sys
+import time
+from io import BytesIO
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from tornado.concurrent import Future
+from tornado.httpclient import HTTPResponse
+from tornado.ioloop import IOLoop
+
+from influxtor import InfluxDBClient
+
+
+_QUERY_BODY = json.dumps({'results': [{'statement_id': 0, 'series': [{
+    'name': 'cpu', 'columns': ['time', 'value'],
+    'values': [[1500000000, 0.5]]}]}]}).encode('utf-8')
+
+
+class InstantHTTPClient(object):
+
+    def fetch(self, request, **kwargs):
+        path = request.url.split('?')[0].rsplit('/', 1)[-1]
+        if path == 'query':
+            response = HTTPResponse(request, 200, buffer=BytesIO(_QUERY_BODY))
+        else:
+            response = HTTPResponse(request, 204, buffer=BytesIO(b''))
+        future = Future()
+        future.set_result(response)
+        return future
+
+    def close(self):
+        pass
+
+
+results = {}
+
+
+async def bench(name, call, calls):
+    start = time.time()
+    for _ in range(calls):
+        await call()
+    results[name] = (time.time() - start) / calls * 1e6
+    print("%-16s %8.1f us/call" % (name, results[name]), file=sys.stderr)
+
+
+async def main(calls):
+    client = InfluxDBClient('127.0.0.1', 8086, None, None, 'bench')
+    client._http_clients['query'] = InstantHTTPClient()
+    point = [{'measurement': 'cpu', 'tags': {'host': 'a'},
+              'fields': {'value': 0.5}}]
+
+    await bench('ping', client.ping, calls)
+    await bench('query', lambda: client.query('SELECT value FROM cpu'),
+                calls)
+    query = 'SELECT value FROM cpu WHERE host = $host'
+    await bench('query_bind',
+                lambda: client.query(query, bind_params={'host': 'a'}),
+                calls)
+    prepared = client.prepare(query)
+    await bench('prepared',
+                lambda: prepared.execute({'host': 'a'}), calls)
+    await bench('write_points', lambda: client.write_points(point), calls)
+    await bench('create_database',
+                lambda: client.create_database('bench'), calls)
+
+
+if __name__ == '__main__':
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    IOLoop.current().run_sync(lambda: main(calls))
+    print(json.dumps(results, indent=2, sort_keys=True))
@@ -0,0 +1,241 @@
+# coding:utf-8
+"""Run the benchmark suite against a local stub InfluxDB server.
+
+Measures write throughput across batch sizes, query latency and decode
+throughput across result sizes, chunked query throughput and line
+protocol encoder speed, and prints the results as JSON.
+
+Usage: python benchmarks/run.py [--quick] [--output results.json]
+                                [--compare baseline.json [--tolerance 0.1]]
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import tornado
+from influxdb.line_protocol import make_lines as influxdb_make_lines
+from tornado.ioloop import IOLoop
+
+import influxtor
+from influxtor import InfluxDBClient
+from influxtor.line_protocol import LineProtocolEncoder
+
+from bench_line_protocol import make_points
+
+
+def log(message, *args):
+    print(message % args, file=sys.stderr)
+
+
+def start_stub():
+    """Start the stub server in its own process, so that it does not share
+    the benchmark's CPU, and return the process and its port."""
+    stub = subprocess.Popen(
+        [sys.executable,
+         os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                      'stub_server.py'),
+         '--port', '0'],
+        stdout=subprocess.PIPE)
+    port = int(stub.stdout.readline())
+    return stub, port
+
+
+async def bench_writes(client, total, batch_sizes):
+    points = make_points(total, 1000)['points']
+    results = []
+    for batch_size in batch_sizes:
+        start = time.time()
+        await client.write_points(points, batch_size=batch_size)
+        seconds = time.time() - start
+        log("write    batch %6d  %10.0f points/s", batch_size,
+            total / seconds)
+        results.append({
+            'batch_size': batch_size,
+            'points': total,
+            'seconds': seconds,
+            'points_per_second': total / seconds,
+        })
+    return results
+
+
+async def bench_queries(client, sizes, repeat):
+    results = []
+    for rows in sizes:
+        query = 'SELECT * FROM bench SLIMIT 10 LIMIT %d' % (rows * 10)
+        await client.query(query, cache_ttl=0)
+        decode = client.metrics.timings['decode']
+        decode_before = decode.sum
+        latencies = []
+        for _ in range(repeat):
+            start = time.time()
+            await client.query(query, cache_ttl=0)
+            latencies.append(time.time() - start)
+        latencies.sort()
+        decode_seconds = (decode.sum - decode_before) / repeat
+        result = {
+            'rows': rows * 10,
+            'repeat': repeat,
+            'p50_ms': latencies[len(latencies) // 2] * 1000,
+            'mean_ms': sum(latencies) / repeat * 1000,
+            'rows_per_second': rows * 10 * repeat / sum(latencies),
+            'decode_rows_per_second':
+                rows * 10 / decode_seconds if decode_seconds else None,
+        }
+        log("query    rows %7d  p50 %8.2f ms  %10.0f rows/s",
+            result['rows'], result['p50_ms'], result['rows_per_second'])
+        results.append(result)
+    return results
+
+
+async def bench_chunked(client, rows, chunk_size):
+    query = 'SELECT * FROM bench LIMIT %d' % rows
+    start = time.time()
+    stream = client.query_stream(query, chunk_size=chunk_size, raw=True)
+    received = 0
+    while True:
+        result = await stream.read()
+        if result is None:
+            break
+        for series in result.get('series', []):
+            received += len(series['values'])
+    seconds = time.time() - start
+    log("chunked  rows %7d  %10.0f rows/s", received, received / seconds)
+    return {
+        'rows': received,
+        'chunk_size': chunk_size,
+        'seconds': seconds,
+        'rows_per_second': received / seconds,
+    }
+
+
+def bench_encoder(count, repeat):
+    data = make_points(count, 1000)
+    encoder = LineProtocolEncoder()
+    baseline = min(timeit.repeat(
+        lambda: influxdb_make_lines(data).encode('utf-8'),
+        number=1, repeat=repeat))
+    fast = min(timeit.repeat(lambda: encoder.make_lines(data),
+                             number=1, repeat=repeat))
+    log("encode   points %5d  %10.0f points/s  (%.1fx make_lines)",
+        count, count / fast, baseline / fast)
+    return {
+        'points': count,
+        'points_per_second': count / fast,
+        'baseline_points_per_second': count / baseline,
+        'speedup': baseline / fast,
+    }
+
+
+def flatten(results, prefix=''):
+    """Flatten the results into {'write.1000.points_per_second': ...}."""
+    flat = {}
+    if isinstance(results, dict):
+        for key, value in results.items():
+            flat.update(flatten(value, prefix + key + '.'))
+    elif isinstance(results, list):
+        for item in results:
+            name = item.get('batch_size', item.get('rows'))
+            flat.update(flatten(item, '%s%s.' % (prefix, name)))
+    elif isinstance(results, (int, float)) and not isinstance(results, bool):
+        flat[prefix[:-1]] = results
+    return flat
+
+
+def compare(results, baseline, tolerance):
+    """Return the metrics that got worse than baseline by more than
+    tolerance; throughputs should not drop, latencies should not grow."""
+    current = flatten(results['benchmarks'])
+    regressions = []
+    for key, old in sorted(flatten(baseline['benchmarks']).items()):
+        new = current.get(key)
+        if new is None or not old:
+            continue
+        if key.endswith('per_second') or key.endswith('speedup'):
+            change = (old - new) / old
+        elif key.endswith('_ms'):
+            change = (new - old) / old
+        else:
+            continue
+        if change > tolerance:
+            regressions.append({'metric': key, 'baseline': old,
+                                'current': new, 'worse_by': change})
+    return regressions
+
+
+async def run(port, quick):
+    client = InfluxDBClient('127.0.0.1', port, None, None, 'bench')
+    try:
+        benchmarks = {
+            'write': (await bench_writes(
+                client, 20000 if quick else 200000,
+                [100, 1000, 5000] if quick else [100, 1000, 5000, 20000])),
+            'query': (await bench_queries(
+                client, [1, 100, 1000] if quick else [1, 100, 1000, 10000],
+                5 if quick else 20)),
+            'chunked_query': (await bench_chunked(
+                client, 20000 if quick else 500000, 10000)),
+            'encode': bench_encoder(10000 if quick else 50000,
+                                    3 if quick else 5),
+        }
+    finally:
+        client.close()
+    return benchmarks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--quick', action='store_true',
+                        help='smaller sizes, for a quick check')
+    parser.add_argument('--output', help='write the results to this file')
+    parser.add_argument('--compare', metavar='BASELINE',
+                        help='results of an earlier run to compare with; '
+                             'exits with status 1 on regressions')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='relative slowdown reported as a regression, '
+                             'defaults to 0.1')
+    args = parser.parse_args()
+
+    stub, port = start_stub()
+    try:
+        benchmarks = IOLoop.current().run_sync(lambda: run(port, args.quick))
+    finally:
+        stub.terminate()
+        stub.wait()
+
+    results = {
+        'timestamp': time.time(),
+        'python': platform.python_version(),
+        'tornado': tornado.version,
+        'influxtor': influxtor.__version__,
+        'quick': args.quick,
+        'benchmarks': benchmarks,
+    }
+    status = 0
+    if args.compare:
+        with open(args.compare) as f:
+            results['regressions'] = compare(results, json.load(f),
+                                             args.tolerance)
+        for regression in results['regressions']:
+            log("REGRESSION %(metric)s: %(baseline).4g -> %(current).4g",
+                regression)
+        status = 1 if results['regressions'] else 0
+
+    output = json.dumps(results, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+    sys.exit(status)
+
+
+if __name__ == '__main__':
+    main()
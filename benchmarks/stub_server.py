@@ -0,0 +1,131 @@
+# coding:utf-8
+"""A stub InfluxDB server for benchmarks.
+
+It accepts and discards writes, counting their points, and answers queries
+with generated data: a query ending in ``LIMIT <n>`` returns n rows, split
+over the series asked for with ``SLIMIT <n>``. Chunked queries are
+answered with one JSON document per chunk.
+
+Usage: python benchmarks/stub_server.py [--port 8086]
+"""
+
+import argparse
+import json
+import re
+import sys
+import zlib
+
+import tornado.web
+from tornado.httpserver import HTTPServer
+from tornado.ioloop import IOLoop
+from tornado.testing import bind_unused_port
+
+
+_LIMIT = re.compile(r'\bLIMIT\s+(\d+)', re.IGNORECASE)
+_SLIMIT = re.compile(r'\bSLIMIT\s+(\d+)', re.IGNORECASE)
+
+VERSION = '1.8.10-stub'
+
+
+def make_series(rows, series):
+    per_series = max(1, rows // series)
+    return [{
+        'name': 'bench',
+        'tags': {'host': 'server%04d' % s},
+        'columns': ['time', 'value', 'count', 'status'],
+        'values': [[1500000000000000000 + i * 1000000000, i * 0.25, i, 'ok']
+                   for i in range(per_series)],
+    } for s in range(series)]
+
+
+class WriteHandler(tornado.web.RequestHandler):
+
+    def post(self):
+        body = self.request.body
+        if self.request.headers.get('Content-Encoding') == 'gzip':
+            body = zlib.decompress(body, 16 + zlib.MAX_WBITS)
+        stats = self.application.stats
+        stats['writes'] += 1
+        stats['points'] += body.count(b'\n')
+        stats['bytes'] += len(self.request.body)
+        self.set_status(204)
+
+
+class QueryHandler(tornado.web.RequestHandler):
+
+    _bodies = {}
+
+    def _series(self, query):
+        limit = _LIMIT.search(query)
+        slimit = _SLIMIT.search(query)
+        rows = int(limit.group(1)) if limit else 1
+        series = int(slimit.group(1)) if slimit else 1
+        return make_series(rows, series)
+
+    async def get(self):
+        query = self.get_argument('q')
+        self.application.stats['queries'] += 1
+        self.set_header('Content-Type', 'application/json')
+        self.set_header('X-Influxdb-Version', VERSION)
+
+        if self.get_argument('chunked', 'false') == 'true':
+            chunk_size = int(self.get_argument('chunk_size', 10000))
+            for series in self._series(query):
+                values = series['values']
+                for start in range(0, len(values), chunk_size):
+                    chunk = dict(series, values=values[start:start +
+                                                       chunk_size])
+                    self.write(json.dumps({'results': [{
+                        'statement_id': 0, 'series': [chunk],
+                        'partial': True}]}) + '\n')
+                    await self.flush()
+            return
+
+        body = self._bodies.get(query)
+        if body is None:
+            body = self._bodies[query] = json.dumps({'results': [{
+                'statement_id': 0, 'series': self._series(query)}]})
+        self.write(body)
+
+
+class PingHandler(tornado.web.RequestHandler):
+
+    def get(self):
+        self.set_header('X-Influxdb-Version', VERSION)
+        self.set_status(204)
+
+
+def make_app():
+    app = tornado.web.Application([
+        (r'/write', WriteHandler),
+        (r'/query', QueryHandler),
+        (r'/ping', PingHandler),
+    ])
+    app.stats = {'writes': 0, 'points': 0, 'bytes': 0, 'queries': 0}
+    return app
+
+
+def start(port=None):
+    """Start the stub on the current IOLoop and return its port."""
+    server = HTTPServer(make_app())
+    if port:
+        server.listen(port, '127.0.0.1')
+    else:
+        sock, port = bind_unused_port()
+        server.add_sockets([sock])
+    return port
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=8086,
+                        help='port to listen on, 0 for any free port')
+    args = parser.parse_args()
+    port = start(args.port)
+    print(port)
+    sys.stdout.flush()
+    IOLoop.current().start()
+
+
+if __name__ == '__main__':
+    main()
@@ -2,7 +2,6 @@
 
 import tornado.ioloop
 import tornado.web
-from tornado.gen import coroutine
 from influxtor import InfluxDBClient
 
 INFLUXDB_HOST = "127.0.0.1"
@@ -17,8 +16,7 @@ client = InfluxDBClient(INFLUXDB_HOST, INFLUXDB_PORT, INFLUXDB_USER, INFLUXDB_PA
 
 class QueryHandler(tornado.web.RequestHandler):
 
-    @coroutine
-    def get(self):
+    async def get(self):
         minutes_ago = self.get_argument("m", None)
 
         try:
@@ -28,14 +26,13 @@ class QueryHandler(tornado.web.RequestHandler):
             return
         remote_ip = self.request.remote_ip
         query_str = "SELECT value FROM example_data WHERE remote_ip = '%s' AND time > now() - %dm" % (remote_ip, minutes_ago)
-        res = yield client.query(query_str)
+        res = await client.query(query_str)
         self.write("{0}".format(res))
 
 
 class WriteHandler(tornado.web.RequestHandler):
 
-    @coroutine
-    def get(self):
+    async def get(self):
         self.write(
             '<form method="post">'
             '<p>value: <input type="text" name="v"></p>'
@@ -44,8 +41,7 @@ class WriteHandler(tornado.web.RequestHandler):
         )
 
 
-    @coroutine
-    def post(self):
+    async def post(self):
         v = self.get_argument("v", None)
         try:
             v = int(v)
@@ -53,7 +49,7 @@ class WriteHandler(tornado.web.RequestHandler):
             self.write("Wrong Value")
             return
         remote_ip = self.request.remote_ip
-        res = yield client.write_points([{
+        res = await client.write_points([{
             "measurement": "example_data",
             "tags": {
                 "remote_ip": remote_ip
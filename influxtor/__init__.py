@@ -1,10 +1,38 @@
 #coding:utf-8
 
-from client import InfluxDBClient
+from .client import InfluxDBClient
+from .buffered import BufferedWriter
+from .cache import QueryCache
+from .cluster import ClusterClient
+from .codec import CSVCodec, JSONCodec
+from .follow import QueryFollower
+from .metrics import ClientMetrics
+from .ratelimit import WriteLimiter
+from .retry import CircuitBreaker, RetryPolicy
+from .schema import SchemaRegistry
+from .sharding import HashRing, ShardedClient
+from .spool import WriteSpool
+from .stream import QueryStream, SplitQueryStream
 
 
 __all__ = [
     'InfluxDBClient',
+    'BufferedWriter',
+    'QueryCache',
+    'ClusterClient',
+    'ShardedClient',
+    'HashRing',
+    'QueryStream',
+    'SplitQueryStream',
+    'QueryFollower',
+    'WriteSpool',
+    'RetryPolicy',
+    'CircuitBreaker',
+    'JSONCodec',
+    'CSVCodec',
+    'ClientMetrics',
+    'SchemaRegistry',
+    'WriteLimiter',
 ]
 
 
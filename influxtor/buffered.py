@@ -0,0 +1,169 @@
+# coding:utf-8
+
+import logging
+
+from tornado.ioloop import PeriodicCallback
+from tornado.locks import Lock
+
+from .line_protocol import encode_points
+
+
+logger = logging.getLogger(__name__)
+
+
+class BufferedWriter(object):
+    """Accumulate points in memory and write them to InfluxDB in batches.
+
+    A flush is triggered when the buffer holds ``max_points`` points, when
+    the encoded buffer reaches ``max_bytes`` bytes, or at the latest
+    ``flush_interval`` milliseconds after a point has been added.
+
+    :param client: the client used to send the batches
+    :type client: :class:`~.InfluxDBClient`
+    :param max_points: flush when this many points are buffered
+    :type max_points: int
+    :param max_bytes: flush when the encoded buffer reaches this many bytes,
+        defaults to None (no byte limit)
+    :type max_bytes: int
+    :param flush_interval: maximum time in milliseconds a point may stay in
+        the buffer, defaults to 1000. None or 0 disables timed flushes
+    :type flush_interval: int
+    :param time_precision: precision of the buffered points' timestamps
+    :type time_precision: str
+    :param database: database to write to, defaults to the client's database
+    :type database: str
+    :param retention_policy: retention policy to write to
+    :type retention_policy: str
+    :param tags: tags added to every buffered point
+    :type tags: dict
+    """
+
+    def __init__(self,
+                 client,
+                 max_points=5000,
+                 max_bytes=None,
+                 flush_interval=1000,
+                 time_precision=None,
+                 database=None,
+                 retention_policy=None,
+                 tags=None,
+                 ):
+        if time_precision not in ['n', 'u', 'ms', 's', 'm', 'h', None]:
+            raise ValueError(
+                "Invalid time precision is given. "
+                "(use 'n', 'u', 'ms', 's', 'm' or 'h')")
+
+        self._client = client
+        self._max_points = max_points
+        self._max_bytes = max_bytes
+        self._flush_interval = flush_interval
+        self._time_precision = time_precision
+        self._database = database
+        self._retention_policy = retention_policy
+        self._tags = tags
+
+        self._lines = []
+        self._bytes = 0
+        self._lock = Lock()
+        self._timer = None
+        self._closed = False
+
+    @property
+    def pending_points(self):
+        """Number of points waiting to be flushed."""
+        return len(self._lines)
+
+    @property
+    def pending_bytes(self):
+        """Size in bytes of the encoded points waiting to be flushed."""
+        return self._bytes
+
+    def _start_timer(self):
+        if self._timer is None and self._flush_interval:
+            self._timer = PeriodicCallback(self._on_timer,
+                                           self._flush_interval)
+            self._timer.start()
+
+    async def _on_timer(self):
+        if not self._lines:
+            return
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("Timed flush of %d points failed",
+                             len(self._lines))
+
+    async def write_points(self, points, protocol='json'):
+        """Add points to the buffer.
+
+        Returns once the points are buffered or, if they filled the
+        buffer, once the triggered flush has completed.
+
+        :param points: the points to buffer
+        :type points: (if protocol is 'json') list of dicts
+                      (if protocol is 'line') sequence of line protocol strings
+        :param protocol: protocol of input data, either 'json' or 'line'
+        :type protocol: str
+        :returns: True
+        :rtype: bool
+        """
+        if self._closed:
+            raise RuntimeError("BufferedWriter is closed")
+
+        if protocol == 'json':
+            data = {'points': points}
+            if self._tags is not None:
+                data['tags'] = self._tags
+            lines = encode_points(data, self._time_precision)
+        else:
+            lines = [line.encode('utf-8') if isinstance(line, str)
+                     else line for line in points]
+
+        for line in lines:
+            self._lines.append(line)
+            self._bytes += len(line) + 1
+
+        self._start_timer()
+
+        if len(self._lines) >= self._max_points or \
+                (self._max_bytes and self._bytes >= self._max_bytes):
+            await self.flush()
+        return True
+
+    async def flush(self):
+        """Write all buffered points to InfluxDB.
+
+        Flushes are serialized, so batches reach the server in the order
+        their points were buffered. If the write fails, its points are put
+        back at the front of the buffer for the next flush.
+
+        :returns: the number of points written
+        :rtype: int
+        """
+        async with self._lock:
+            lines, self._lines = self._lines, []
+            size, self._bytes = self._bytes, 0
+            if not lines:
+                return 0
+            try:
+                await self._client._write_points(
+                    points=lines,
+                    time_precision=self._time_precision,
+                    database=self._database,
+                    retention_policy=self._retention_policy,
+                    tags=None,
+                    protocol='line')
+            except BaseException:
+                # points buffered meanwhile stay behind the failed ones
+                self._lines = lines + self._lines
+                self._bytes += size
+                raise
+            return len(lines)
+
+    async def close(self):
+        """Stop the flush timer and write the remaining points."""
+        self._closed = True
+        if self._timer is not None:
+            self._timer.stop()
+            self._timer = None
+        await self.flush()
@@ -0,0 +1,179 @@
+# coding:utf-8
+
+import re
+import time
+from collections import OrderedDict
+
+from .influxql import is_read_only, measurements as query_measurements
+
+
+_GROUP_BY_TIME = re.compile(
+    u'\\bGROUP\\s+BY\\b.*?\\btime\\(\\s*(\\d+)(ns|u|\u00b5|ms|s|m|h|d|w)\\b',
+    re.IGNORECASE | re.UNICODE | re.DOTALL)
+_DURATION_SECONDS = {
+    'ns': 1e-9, 'u': 1e-6, u'\u00b5': 1e-6, 'ms': 1e-3,
+    's': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800,
+}
+
+
+class QueryCache(object):
+    """LRU cache of parsed query responses.
+
+    Entries expire after their TTL and the least recently used entries are
+    evicted once the cached responses exceed ``max_bytes``. Only ``SELECT``
+    (without ``INTO``) and ``SHOW`` queries are cached.
+
+    :param ttl: default time to live of an entry in seconds, defaults to 10
+    :type ttl: float
+    :param max_bytes: memory budget, counted as the size of the response
+        bodies, defaults to 64 MiB
+    :type max_bytes: int
+    :param bucket_aware: expire entries of queries relative to ``now()`` that
+        ``GROUP BY time(...)`` no later than the start of the next time
+        bucket, when a new bucket appears in their results, defaults to True
+    :type bucket_aware: bool
+    :param invalidate_on_write: drop the entries of queries reading from a
+        measurement whenever the client writes to it, defaults to False
+    :type invalidate_on_write: bool
+
+    :Example:
+
+    ::
+
+        >> cache = QueryCache(ttl=5, max_bytes=32 * 1024 * 1024)
+        >> client = InfluxDBClient(database='metrics', query_cache=cache)
+        >> cache.stats()
+        {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0,
+         'entries': 0, 'bytes': 0}
+    """
+
+    def __init__(self,
+                 ttl=10,
+                 max_bytes=64 * 1024 * 1024,
+                 bucket_aware=True,
+                 invalidate_on_write=False):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.bucket_aware = bucket_aware
+        self.invalidate_on_write = invalidate_on_write
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._by_measurement = {}
+
+    def _now(self):
+        return time.time()
+
+    @staticmethod
+    def cacheable(query):
+        """Whether the query is read-only and can be cached."""
+        return is_read_only(query)
+
+    @staticmethod
+    def key(database, query, epoch=None, params=None, format='json'):
+        """Build the cache key of a query."""
+        extra = tuple(sorted((k, v) for k, v in (params or {}).items()
+                             if k not in ('q', 'db', 'epoch')))
+        return (database, query, epoch, extra, format)
+
+    def get(self, key):
+        """Return the cached response for key, or None."""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry[0] <= self._now():
+            self._forget(key, entry)
+            self.misses += 1
+            return None
+        self._entries[key] = entry
+        self.hits += 1
+        return entry[2]
+
+    def put(self, key, data, size, ttl=None):
+        """Cache the parsed response of a query.
+
+        :param key: the key built by :meth:`key`
+        :param data: the parsed response
+        :param size: the size of the response body in bytes
+        :type size: int
+        :param ttl: time to live in seconds, defaults to the cache's ttl
+        :type ttl: float
+        """
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._forget(key, self._entries.pop(key))
+
+        database, query = key[0], key[1]
+        now = self._now()
+        expires = now + (self.ttl if ttl is None else ttl)
+        if self.bucket_aware and 'now()' in query.lower():
+            match = _GROUP_BY_TIME.search(query)
+            if match:
+                bucket = int(match.group(1)) * \
+                    _DURATION_SECONDS[match.group(2).lower()]
+                expires = min(expires, (now // bucket + 1) * bucket)
+
+        measurements = query_measurements(query)
+        self._entries[key] = (expires, size, data, database, measurements)
+        self._bytes += size
+        for measurement in measurements:
+            self._by_measurement.setdefault(
+                (database, measurement), set()).add(key)
+
+        while self._bytes > self.max_bytes:
+            old_key, old_entry = self._entries.popitem(last=False)
+            self._forget(old_key, old_entry)
+            self.evictions += 1
+
+    def _forget(self, key, entry):
+        self._bytes -= entry[1]
+        for measurement in entry[4]:
+            keys = self._by_measurement.get((entry[3], measurement))
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_measurement[(entry[3], measurement)]
+
+    def invalidate(self, database, measurements):
+        """Drop the entries of queries reading from the given measurements.
+
+        :param database: the database written to
+        :type database: str
+        :param measurements: the measurements written to
+        :type measurements: iterable of str
+        """
+        keys = set()
+        for measurement in list(measurements) + [None]:
+            keys.update(self._by_measurement.get((database, measurement), ()))
+        for key in keys:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._forget(key, entry)
+                self.invalidations += 1
+
+    def clear(self):
+        """Drop all entries."""
+        self._entries.clear()
+        self._by_measurement.clear()
+        self._bytes = 0
+
+    def stats(self):
+        """Return the cache counters.
+
+        :rtype: dict
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+            'entries': len(self._entries),
+            'bytes': self._bytes,
+        }
@@ -1,36 +1,164 @@
 # coding:utf-8
 
-import json
-import urllib
-
-from tornado.gen import coroutine, Return
-from influxdb.line_protocol import make_lines, quote_ident, quote_literal
+import logging
+import re
+import time
+import zlib
+from collections import OrderedDict
+from datetime import timedelta
+from types import MappingProxyType
+from urllib.parse import urlencode
+
+from tornado.concurrent import (Future, chain_future,
+                                future_set_exception_unless_cancelled,
+                                future_set_result_unless_cancelled)
+from tornado.gen import convert_yielded, multi, sleep
+from influxdb.line_protocol import quote_ident, quote_literal
 from influxdb.resultset import ResultSet
-from tornado.httpclient import AsyncHTTPClient, HTTPRequest
-
-
-class InfluxDBClientError(Exception):
-    """Raised when an error occurs in the request."""
-    def __init__(self, content, code=None):
-        if isinstance(content, type(b'')):
-            content = content.decode('UTF-8', 'replace')
-
-        if code is not None:
-            message = "%s: %s" % (code, content)
-        else:
-            message = content
-
-        super(InfluxDBClientError, self).__init__(
-            message
-        )
-        self.content = content
-        self.code = code
-
+from tornado.httpclient import HTTPError, HTTPRequest
+from tornado.ioloop import IOLoop
+from tornado.util import import_object
+
+from .buffered import BufferedWriter
+from .codec import get_codec
+from .columns import result_columns
+from .exceptions import (InfluxDBCircuitOpenError, InfluxDBClientError,
+                         InfluxDBPartialWriteError, InfluxDBServerError,
+                         is_server_failure)
+from .follow import QueryFollower
+from .influxql import (is_descending, is_read_only, is_single_statement,
+                       with_time_range)
+from .line_protocol import (_convert_timestamp, make_lines,
+                            make_lines_columns)
+from .metrics import ClientMetrics
+from .prepared import PreparedQuery
+from .stream import QueryStream, SplitQueryStream
+
+
+logger = logging.getLogger(__name__)
+
+_LINE_SERIES_KEY = re.compile(r'(?:[^ \\]|\\.)*')
+
+_LINE_MEASUREMENT = re.compile(r'(?:[^ ,\\]|\\.)*')
+_LINE_UNESCAPE = re.compile(r'\\(.)')
+
+_GZIP_WBITS = 16 + zlib.MAX_WBITS
+# prepared queries kept by InfluxDBClient.prepare
+_PREPARED_CACHE_SIZE = 1000
+# encoded write URLs kept per client, by write parameters
+_WRITE_URL_CACHE_SIZE = 1000
+# error InfluxDB gives the statements after one that failed
+_NOT_EXECUTED = 'not executed'
+# client arguments holding the state of a single client
+_PER_CLIENT_ARGS = ('spool', 'write_limiter', 'schema')
+
+_HTTP_BACKENDS = {
+    'simple': 'tornado.simple_httpclient.SimpleAsyncHTTPClient',
+    'curl': 'tornado.curl_httpclient.CurlAsyncHTTPClient',
+}
+
+
+def _gzip_compress(data, level):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, _GZIP_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+def _gzip_decompress(data):
+    return zlib.decompress(data, _GZIP_WBITS)
+
+
+def _nanoseconds(value):
+    if isinstance(value, timedelta):
+        return ((value.days * 86400 + value.seconds) * 10 ** 9 +
+                value.microseconds * 10 ** 3)
+    return int(_convert_timestamp(value))
+
+
+def _merge_results(results):
+    """Merge the results of adjacent time ranges, given in the order their
+    points should appear, into one result."""
+    merged = {}
+    series = OrderedDict()
+    for result in results:
+        if 'error' in result:
+            return result
+        if 'statement_id' in result:
+            merged.setdefault('statement_id', result['statement_id'])
+        for item in result.get('series', []):
+            key = (item.get('name'),
+                   tuple(sorted((item.get('tags') or {}).items())))
+            values = item.get('values', [])
+            into = series.get(key)
+            if into is None:
+                into = series[key] = dict(item, values=list(values))
+                into.pop('partial', None)
+                continue
+            columns = item['columns']
+            if columns != into['columns']:
+                # a later range returned columns the earlier ones lacked
+                added = [column for column in columns
+                         if column not in into['columns']]
+                if added:
+                    into['values'] = [row + [None] * len(added)
+                                      for row in into['values']]
+                    into['columns'] = into['columns'] + added
+                width = len(into['columns'])
+                index = [into['columns'].index(column) for column in columns]
+                rows = []
+                for row in values:
+                    full = [None] * width
+                    for i, value in zip(index, row):
+                        full[i] = value
+                    rows.append(full)
+                values = rows
+            into['values'].extend(values)
+    if series:
+        merged['series'] = list(series.values())
+    return merged
+
+
+def _encode_shard(data, precision):
+    # module level, so a process pool can pickle it
+    return make_lines(data, precision)
+
+
+def _is_client_error(error):
+    if isinstance(error, InfluxDBClientError):
+        return True
+    return isinstance(error, HTTPError) and 400 <= error.code < 500
+
+
+def _client_kwargs(kwargs, name):
+    # for wrappers creating a client per host: per-client objects are
+    # passed as factories and built for each 'host:port' name
+    kwargs = dict(kwargs)
+    for arg in _PER_CLIENT_ARGS:
+        factory = kwargs.get(arg)
+        if factory is None:
+            continue
+        if not callable(factory):
+            raise ValueError(
+                "%s cannot be shared by the clients of several hosts; pass "
+                "a function creating one for a 'host:port' name" % arg)
+        kwargs[arg] = factory(name)
+    return kwargs
+
+
+def _written_measurements(data, protocol):
+    if protocol == 'json':
+        default = data.get('measurement')
+        return set(point.get('measurement', default)
+                   for point in data['points'])
+    if isinstance(data, bytes):
+        data = data.decode('utf-8').splitlines()
+    measurements = set()
+    for line in data:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        measurement = _LINE_MEASUREMENT.match(line).group(0)
+        measurements.add(_LINE_UNESCAPE.sub(r'\1', measurement))
+    return measurements
 
-class InfluxDBServerError(Exception):
-    """Raised when a server error occurs."""
-    def __init__(self, content):
-        super(InfluxDBServerError, self).__init__(content)
 
 class InfluxDBClient(object):
 
@@ -42,13 +170,176 @@ class InfluxDBClient(object):
                  database=None,
                  ssl=False,
                  verify_ssl=False,
+                 gzip=False,
+                 gzip_level=6,
+                 gzip_offload_size=256 * 1024,
+                 query_cache=None,
+                 coalesce_queries=False,
+                 query_batch_window=None,
+                 query_batch_size=20,
+                 http_backend='simple',
+                 max_clients=10,
+                 write_max_clients=None,
+                 connect_timeout=20.0,
+                 request_timeout=20.0,
+                 spool=None,
+                 retry_policy=None,
+                 circuit_breaker=None,
+                 codec='json',
+                 metrics=None,
+                 write_limiter=None,
+                 encode_executor=None,
+                 encode_offload_points=None,
+                 encode_shard_points=5000,
+                 schema=None,
                  ):
+        """Create a client.
+
+        :param host: hostname to connect to InfluxDB, defaults to 'localhost'
+        :type host: str
+        :param port: port to connect to InfluxDB, defaults to 8086
+        :type port: int
+        :param username: user to connect, defaults to 'root'
+        :type username: str
+        :param password: password of the user, defaults to 'root'
+        :type password: str
+        :param database: database name to connect to, defaults to None
+        :type database: str
+        :param ssl: use https instead of http to connect to InfluxDB,
+            defaults to False
+        :type ssl: bool
+        :param verify_ssl: verify SSL certificates for HTTPS requests,
+            defaults to False
+        :type verify_ssl: bool
+        :param gzip: compress write bodies and ask for compressed query
+            responses, defaults to False
+        :type gzip: bool
+        :param gzip_level: zlib compression level of write bodies, from 1
+            (fastest) to 9 (smallest), defaults to 6
+        :type gzip_level: int
+        :param gzip_offload_size: bodies of at least this many bytes are
+            compressed (in ``encode_executor``) and decompressed (in the
+            IOLoop's executor) off the IOLoop thread, defaults to 256 KiB
+        :type gzip_offload_size: int
+        :param query_cache: cache for the responses of read-only queries,
+            defaults to None (no caching)
+        :type query_cache: :class:`~.QueryCache`
+        :param coalesce_queries: share one request and its parsed response
+            between concurrent identical queries, defaults to False
+        :type coalesce_queries: bool
+        :param query_batch_window: collect distinct read-only queries issued
+            within this many milliseconds into one multi-statement request,
+            defaults to None (no batching)
+        :type query_batch_window: float
+        :param query_batch_size: maximum number of statements per batched
+            request, defaults to 20
+        :type query_batch_size: int
+        :param http_backend: tornado HTTP client implementation, 'simple' or
+            'curl'. Only 'curl' (which requires pycurl) keeps connections
+            alive between requests, defaults to 'simple'
+        :type http_backend: str
+        :param max_clients: number of concurrent requests of the client's
+            connection pool; further requests wait in its queue, defaults
+            to 10
+        :type max_clients: int
+        :param write_max_clients: if set, writes get their own pool of this
+            size so slow queries cannot hold up ingestion, defaults to None
+            (writes and queries share one pool)
+        :type write_max_clients: int
+        :param connect_timeout: timeout for the initial connection in
+            seconds, defaults to 20
+        :type connect_timeout: float
+        :param request_timeout: timeout for a whole request in seconds,
+            defaults to 20
+        :type request_timeout: float
+        :param spool: on-disk spool taking the writes that fail with server
+            or connection errors, defaults to None
+        :type spool: :class:`~.WriteSpool`
+        :param retry_policy: when and how often failed requests are sent
+            again, defaults to None (no retries)
+        :type retry_policy: :class:`~.RetryPolicy`
+        :param circuit_breaker: fails requests fast while InfluxDB keeps
+            failing, defaults to None
+        :type circuit_breaker: :class:`~.CircuitBreaker`
+        :param codec: how query responses are requested and decoded, 'json'
+            (with orjson or ujson if installed), 'csv' or a codec instance,
+            defaults to 'json'
+        :type codec: str or :class:`~.JSONCodec`
+        :param metrics: where timings and counters are recorded, for a
+            slow query log or hooks, defaults to a new
+            :class:`~.ClientMetrics`
+        :type metrics: :class:`~.ClientMetrics`
+        :param write_limiter: rate limit for writes and the bounded queue
+            holding the writes waiting for it, defaults to None (writes are
+            sent right away)
+        :type write_limiter: :class:`~.WriteLimiter`
+        :param encode_executor: executor encoding large JSON-protocol writes
+            and compressing large bodies, defaults to None (the IOLoop's
+            default thread pool). A
+            :class:`concurrent.futures.ProcessPoolExecutor` spreads the
+            encoding over several cores
+        :type encode_executor: :class:`concurrent.futures.Executor`
+        :param encode_offload_points: writes of at least this many points
+            are encoded in ``encode_executor`` instead of on the IOLoop
+            thread, defaults to None (always encode on the IOLoop thread)
+        :type encode_offload_points: int
+        :param encode_shard_points: offloaded writes are split into shards
+            of this many points, encoded in parallel and concatenated,
+            defaults to 5000
+        :type encode_shard_points: int
+        :param schema: cache of measurements, tag keys and values and field
+            types, which can also check the field types of writes, defaults
+            to None
+        :type schema: :class:`~.SchemaRegistry`
+        """
         self.__host = host
         self.__port = int(port)
         self._username = username
         self._password = password
+        self._auth_params = self._encode_auth()
         self._database = database
         self._verify_ssl = verify_ssl
+        self._gzip = gzip
+        self._gzip_level = gzip_level
+        self._gzip_offload_size = gzip_offload_size
+        self._encode_executor = encode_executor
+        self._encode_offload_points = encode_offload_points
+        self._encode_shard_points = encode_shard_points
+        self._query_cache = query_cache
+        self._coalesce_queries = coalesce_queries
+        self._query_batch_window = query_batch_window
+        self._query_batch_size = query_batch_size
+        self._queries_in_flight = {}
+        self._prepared = OrderedDict()
+        self._query_batches = {}
+        if http_backend not in _HTTP_BACKENDS:
+            raise ValueError("Invalid http_backend is given. "
+                             "(use 'simple' or 'curl')")
+        self._http_backend = http_backend
+        self._pool_sizes = {'query': max_clients}
+        if write_max_clients:
+            self._pool_sizes['write'] = write_max_clients
+        self._http_defaults = {
+            'connect_timeout': connect_timeout,
+            'request_timeout': request_timeout,
+        }
+        self._http_clients = {}
+        self._requests_in_flight = {'query': 0, 'write': 0}
+        self._spool = spool
+        if spool is not None:
+            spool.attach(self)
+        self._retry_policy = retry_policy
+        self._circuit_breaker = circuit_breaker
+        self._codec = get_codec(codec)
+        if metrics is None:
+            metrics = ClientMetrics()
+        self.metrics = metrics
+        self._write_limiter = write_limiter
+        if write_limiter is not None:
+            write_limiter.attach(self)
+        self.schema = schema
+        if schema is not None:
+            schema.attach(self)
         self._scheme = "http"
         if ssl is True:
             self._scheme = "https"
@@ -57,10 +348,18 @@ class InfluxDBClient(object):
             self._host,
             self._port)
 
-        self._headers = {
+        # headers are shared by all requests, so they are read-only
+        self._headers = MappingProxyType({
             'Content-type': 'application/json',
             'Accept': 'text/plain'
-        }
+        })
+        write_headers = dict(self._headers)
+        write_headers['Content-type'] = 'application/octet-stream'
+        if self._gzip:
+            write_headers['Content-Encoding'] = 'gzip'
+        self._write_headers = MappingProxyType(write_headers)
+        self._query_headers = {}
+        self._write_urls = {}
 
     @property
     def _baseurl(self):
@@ -83,6 +382,83 @@ class InfluxDBClient(object):
     def _get_port(self):
         return self.__port
 
+    def _http_client(self, pool):
+        if pool not in self._pool_sizes:
+            pool = 'query'
+        http_client = self._http_clients.get(pool)
+        if http_client is None:
+            # created on first use so it binds to the running IOLoop
+            impl = import_object(_HTTP_BACKENDS[self._http_backend])
+            http_client = self._http_clients[pool] = impl(
+                force_instance=True,
+                max_clients=self._pool_sizes[pool],
+                defaults=self._http_defaults)
+        return http_client
+
+    def pool_stats(self):
+        """Get the state of the client's connection pools.
+
+        :returns: per pool ('query' and, if configured, 'write') its size,
+            the requests sent by this client and not answered yet, and, when
+            the HTTP backend exposes them, the requests being processed and
+            waiting in the backend's queue
+        :rtype: dict
+
+        :Example:
+
+        ::
+
+            >> client.pool_stats()
+            {'query': {'max_clients': 10, 'in_flight': 14, 'active': 10,
+                       'queued': 4}}
+        """
+        stats = {}
+        for pool, size in self._pool_sizes.items():
+            if pool == 'query' and 'write' not in self._pool_sizes:
+                in_flight = sum(self._requests_in_flight.values())
+            else:
+                in_flight = self._requests_in_flight[pool]
+            pool_stats = stats[pool] = {
+                'max_clients': size,
+                'in_flight': in_flight,
+            }
+            http_client = self._http_clients.get(pool)
+            if hasattr(http_client, 'active'):
+                pool_stats['active'] = len(http_client.active)
+                pool_stats['queued'] = len(http_client.queue)
+            elif hasattr(http_client, '_curls'):
+                pool_stats['active'] = \
+                    len(http_client._curls) - len(http_client._free_list)
+                pool_stats['queued'] = len(http_client._requests)
+        return stats
+
+    def stats(self):
+        """Get the client's metrics and the requests in flight.
+
+        :returns: the counters, rates and timings of :attr:`metrics`,
+            under 'in_flight', the requests sent and not answered yet per
+            pool and, under 'write_queue', the write limiter's state
+        :rtype: dict
+        """
+        stats = self.metrics.stats()
+        stats['in_flight'] = dict(self._requests_in_flight)
+        if self._write_limiter is not None:
+            stats['write_queue'] = self._write_limiter.stats()
+        return stats
+
+    @property
+    def write_queue_depth(self):
+        """Number of writes waiting for the write limiter, 0 without one."""
+        if self._write_limiter is None:
+            return 0
+        return self._write_limiter.queue_depth
+
+    def close(self):
+        """Close the client's HTTP connection pools."""
+        for http_client in self._http_clients.values():
+            http_client.close()
+        self._http_clients.clear()
+
     def switch_database(self, database):
         """Change the client's database.
 
@@ -101,86 +477,297 @@ class InfluxDBClient(object):
         """
         self._username = username
         self._password = password
+        self._auth_params = self._encode_auth()
+        self._write_urls.clear()
 
-    @coroutine
-    def write_points(self,
-                     points,
-                     time_precision=None,
-                     database=None,
-                     retention_policy=None,
-                     tags=None,
-                     batch_size=None,
-                     protocol='json'
-                     ):
+    def _encode_auth(self):
+        if self._username and self._password:
+            return urlencode([("u", self._username), ("p", self._password)])
+        return ''
+
+    async def write_points(self,
+                           points,
+                           time_precision=None,
+                           database=None,
+                           retention_policy=None,
+                           tags=None,
+                           batch_size=None,
+                           protocol='json',
+                           max_concurrency=1,
+                           series_ordered=False
+                           ):
+        """Write to multiple time series names.
+
+        :param points: the list of points to be written in the database
+        :type points: list of dictionaries, each dictionary represents a point
+        :param time_precision: either 's', 'm', 'ms' or 'u', defaults to None
+        :type time_precision: str
+        :param database: the database to write the points to, defaults to
+            the client's current database
+        :type database: str
+        :param retention_policy: the retention policy for the points
+        :type retention_policy: str
+        :param tags: a set of key-value pairs associated with each point
+        :type tags: dict
+        :param batch_size: value to write the points in batches instead of
+            all at one time
+        :type batch_size: int
+        :param protocol: protocol for writing data, either 'line' or 'json'
+        :type protocol: str
+        :param max_concurrency: number of batch requests kept in flight at
+            once when batch_size is set, defaults to 1 (sequential)
+        :type max_concurrency: int
+        :param series_ordered: when writing batches concurrently, route all
+            points of a series through the same sequence of requests so they
+            reach the server in order, defaults to False
+        :type series_ordered: bool
+        :returns: True, if the operation is successful, False if the write
+            limiter dropped the (unbatched) write
+        :rtype: bool
+        :raises InfluxDBPartialWriteError: if some batches of a concurrent
+            write failed; the remaining batches are still written
+        """
         if batch_size and batch_size > 0:
+            if max_concurrency and max_concurrency > 1:
+                await self._write_batches_concurrently(
+                    points, batch_size, max_concurrency, series_ordered,
+                    time_precision=time_precision,
+                    database=database,
+                    retention_policy=retention_policy,
+                    tags=tags, protocol=protocol)
+                return True
             for batch in self._batches(points, batch_size):
-                yield self._write_points(points=batch,
+                await self._write_points(points=batch,
                                    time_precision=time_precision,
                                    database=database,
                                    retention_policy=retention_policy,
                                    tags=tags, protocol=protocol)
-            raise Return(True)
+            return True
         else:
-            ret = yield self._write_points(points=points,
+            ret = await self._write_points(points=points,
                                       time_precision=time_precision,
                                       database=database,
                                       retention_policy=retention_policy,
                                       tags=tags, protocol=protocol)
-            raise Return(ret)
+            return ret
+
+    async def _write_batches_concurrently(self, points, batch_size,
+                                          max_concurrency, series_ordered,
+                                          **kwargs):
+        if series_ordered:
+            # every series hashes to one lane and each lane is written by a
+            # single worker, so a series' batches are never reordered
+            lanes = [[] for _ in range(max_concurrency)]
+            for point in points:
+                key = self._series_key(point, kwargs['protocol'])
+                lanes[hash(key) % max_concurrency].append(point)
+            lane_batches = [list(self._batches(lane, batch_size))
+                            for lane in lanes if lane]
+        else:
+            lane_batches = [list(self._batches(points, batch_size))]
+
+        batch_count = 0
+        queues = []
+        for batches in lane_batches:
+            queues.append(iter([(batch_count + i, batch)
+                                for i, batch in enumerate(batches)]))
+            batch_count += len(batches)
+        if not series_ordered:
+            # workers share one iterator and each takes the next free batch
+            queues = queues * min(max_concurrency, batch_count)
+
+        failures = []
+
+        async def worker(queue):
+            for index, batch in queue:
+                try:
+                    await self._write_points(points=batch, **kwargs)
+                except Exception as e:
+                    failures.append((index, batch, e))
+
+        await multi([worker(queue) for queue in queues])
+
+        if failures:
+            failures.sort(key=lambda failure: failure[0])
+            raise InfluxDBPartialWriteError(failures, batch_count)
+
+    @staticmethod
+    def _series_key(point, protocol):
+        if protocol == 'json':
+            return (point.get('measurement'),
+                    tuple(sorted((point.get('tags') or {}).items())))
+        return _LINE_SERIES_KEY.match(point).group(0)
+
+    def buffered(self, **kwargs):
+        """Create a :class:`~.BufferedWriter` writing through this client.
+
+        Keyword arguments are passed to :class:`~.BufferedWriter`.
+
+        :Example:
+
+        ::
+
+            >> writer = client.buffered(max_points=10000, flush_interval=500)
+            >> await writer.write_points(points)
+            >> await writer.close()
+        """
+        return BufferedWriter(self, **kwargs)
 
     def _batches(self, iterable, size):
-        for i in xrange(0, len(iterable), size):
+        for i in range(0, len(iterable), size):
             yield iterable[i:i + size]
 
-    @coroutine
-    def request(self, url, method='GET', params=None, data=None,
-                expected_response_code=200, headers=None):
+    async def _encode(self, data, precision):
+        points = data['points']
+        offload = self._encode_offload_points
+        if not offload or not isinstance(points, (list, tuple)) or \
+                len(points) < offload:
+            return make_lines(data, precision)
+
+        io_loop = IOLoop.current()
+        size = self._encode_shard_points
+        shards = await multi([
+            io_loop.run_in_executor(self._encode_executor, _encode_shard,
+                                    dict(data, points=shard), precision)
+            for shard in self._batches(points, size)])
+        return b''.join(shards)
+
+    async def _compress(self, data):
+        if len(data) >= self._gzip_offload_size:
+            data = await IOLoop.current().run_in_executor(
+                self._encode_executor, _gzip_compress, data,
+                self._gzip_level)
+        else:
+            data = _gzip_compress(data, self._gzip_level)
+        return data
+
+    async def _response_body(self, response):
+        body = response.body
+        if body and response.headers.get('Content-Encoding') == 'gzip':
+            if len(body) >= self._gzip_offload_size:
+                body = await IOLoop.current().run_in_executor(
+                    None, _gzip_decompress, body)
+            else:
+                body = _gzip_decompress(body)
+        return body
+
+    async def request(self, url, method='GET', params=None, data=None,
+                      expected_response_code=200, headers=None,
+                      streaming_callback=None, encoded_params=None):
+        pool = 'write' if url == 'write' else 'query'
         url = "{0}/{1}".format(self._baseurl, url)
 
         if headers is None:
             headers = self._headers
-        _params = {}
-        if self._username and self._password:
-            _params["u"] = self._username
-            _params["p"] = self._password
-
-        if params is not None:
-            for k in params:
-                _k, _v = k, params[k]
-                if isinstance(_k,unicode):
-                    _k = _k.endcode("utf-8")
-                if isinstance(_v,unicode):
-                    _v = _v.encode("utf-8")
-                _params[_k] = _v
-        if _params:
-            url += "?" + urllib.urlencode(_params)
+        query_string = [self._auth_params] if self._auth_params else []
+        if params:
+            query_string.append(urlencode(params))
+        if encoded_params:
+            query_string.append(encoded_params)
+        if query_string:
+            url += "?" + "&".join(query_string)
 
         if isinstance(data, (dict, list)):
-            data = json.dumps(data)
-
-        http_client = AsyncHTTPClient()
-        request = HTTPRequest(url,
-                              method=method,
-                              headers=headers,
-                              body=data,
-                              validate_cert=self._verify_ssl)
-        response = yield http_client.fetch(request)
+            data = self._codec.dumps(data)
+
+        return await self._fetch(pool, url, method, data, headers,
+                                 expected_response_code, streaming_callback)
+
+    async def _fetch(self, pool, url, method, data, headers,
+                     expected_response_code, streaming_callback=None):
+        http_client = self._http_client(pool)
+        breaker = self._circuit_breaker
+        # a retried stream would deliver its first chunks twice
+        policy = self._retry_policy if streaming_callback is None else None
+        attempt = 0
+        while True:
+            attempt += 1
+            if breaker is not None and not breaker.allow():
+                raise InfluxDBCircuitOpenError(
+                    "InfluxDB at %s is failing, circuit open" % self._baseurl)
+
+            request = HTTPRequest(url,
+                                  method=method,
+                                  headers=headers,
+                                  body=data,
+                                  validate_cert=self._verify_ssl,
+                                  streaming_callback=streaming_callback,
+                                  # with gzip enabled, buffered responses
+                                  # are decompressed by _response_body, off
+                                  # the IOLoop if large
+                                  decompress_response=(
+                                      not self._gzip or
+                                      streaming_callback is not None))
+            try:
+                self.metrics._before_request(request)
+            except BaseException:
+                # a failing hook sent nothing; count nothing in flight
+                if breaker is not None:
+                    breaker.record_abandoned()
+                raise
+            self._requests_in_flight[pool] += 1
+            start = time.time()
+            try:
+                response = await http_client.fetch(request)
+            except Exception as e:
+                self.metrics._after_response(request, None, e,
+                                             time.time() - start)
+                if breaker is not None:
+                    if breaker.is_failure(e):
+                        breaker.record_failure()
+                    else:
+                        breaker.record_success()
+                if policy is None or not policy.should_retry(e, attempt):
+                    raise
+                delay = policy.delay(e, attempt)
+                logger.debug("Retrying %s in %.3fs after attempt %d: %s",
+                             url.split('?')[0], delay, attempt, e)
+            except BaseException:
+                # cancelled: neither a success nor a failure, but a half
+                # open breaker must not wait for this trial forever
+                if breaker is not None:
+                    breaker.record_abandoned()
+                raise
+            else:
+                self.metrics._after_response(request, response, None,
+                                             time.time() - start)
+                if breaker is not None:
+                    breaker.record_success()
+                break
+            finally:
+                self._requests_in_flight[pool] -= 1
+            await sleep(delay)
 
         if 500 <= response.code < 600:
             raise InfluxDBServerError(response.error)
         elif response.code == expected_response_code:
-            raise Return(response)
+            return response
         else:
             raise InfluxDBClientError(response.error, response.code)
 
-    @coroutine
-    def query(self,
-              query,
-              params=None,
-              epoch=None,
-              expected_response_code=200,
-              database=None,
-              raise_errors=True):
+    async def ping(self):
+        """Check connectivity to InfluxDB.
+
+        :returns: the version of the InfluxDB the client is connected to
+        :rtype: str
+        """
+        response = await self.request(
+            url="ping",
+            method='GET',
+            expected_response_code=204
+        )
+        return response.headers.get('X-Influxdb-Version')
+
+    async def query(self,
+                    query,
+                    params=None,
+                    epoch=None,
+                    expected_response_code=200,
+                    database=None,
+                    raise_errors=True,
+                    cache_ttl=None,
+                    codec=None,
+                    bind_params=None):
         """Send a query to InfluxDB.
 
         :param query: the actual query string
@@ -200,28 +787,257 @@ class InfluxDBClient(object):
             returns errors, defaults to True
         :type raise_errors: bool
 
+        :param cache_ttl: time to live of the cached response in seconds,
+            defaults to the query cache's ttl; 0 bypasses the cache
+        :type cache_ttl: float
+
+        :param codec: how the response is requested and decoded, 'json',
+            'csv' or a codec instance, defaults to the client's codec
+        :type codec: str or :class:`~.JSONCodec`
+
+        :param bind_params: values of the ``$name`` bind parameters used in
+            the query, sent apart from the query text so they need no
+            escaping, defaults to None
+        :type bind_params: dict
+
         :returns: the queried data
         :rtype: :class:`~.ResultSet`
         """
         if params is None:
             params = {}
+        if bind_params:
+            params['params'] = self._codec.dumps(bind_params)
+
+        return await self._query(query, params, epoch, expected_response_code,
+                                 database or self._database, raise_errors,
+                                 cache_ttl, get_codec(codec) or self._codec)
+
+    async def _query(self, query, params, epoch, expected_response_code,
+                     database, raise_errors, cache_ttl, codec, encoded=None):
+        # encoded is the already urlencoded query string of a prepared
+        # query; params then only tell its executions apart
+        start = time.time()
+        extra = tuple(sorted(params.items()))
+
+        cache = self._query_cache
+        cache_key = None
+        if cache is not None and cache_ttl != 0 and cache.cacheable(query):
+            cache_key = cache.key(database, query, epoch, params,
+                                  codec.format)
+            data = cache.get(cache_key)
+            if data is not None:
+                return self._query_done(query, database, start, data,
+                                        raise_errors)
+
+        if encoded is None:
+            params['q'] = query
+            params['db'] = database
+            if epoch is not None:
+                params['epoch'] = epoch
+
+        if self._coalesce_queries:
+            flight_key = (database, query, epoch, extra,
+                          expected_response_code, codec.format)
+            in_flight = self._queries_in_flight.get(flight_key)
+            while in_flight is not None:
+                # wait on a future of our own, so cancelling this caller
+                # does not cancel the query for the others
+                waiter = Future()
+                chain_future(in_flight, waiter)
+                data = await waiter
+                if data is not None:
+                    return self._query_done(query, database, start, data,
+                                            raise_errors)
+                # the caller running the query was cancelled
+                in_flight = self._queries_in_flight.get(flight_key)
+            in_flight = self._queries_in_flight[flight_key] = Future()
+
+        try:
+            if self._query_batch_window is not None and \
+                    encoded is None and codec.format == 'json' and \
+                    is_read_only(query) and is_single_statement(query):
+                data, size = await self._batched_query(
+                    query, params, extra, expected_response_code, codec)
+            else:
+                data, size = await self._query_data(
+                    params, expected_response_code, codec, encoded)
+        except Exception as e:
+            if self._coalesce_queries:
+                del self._queries_in_flight[flight_key]
+                in_flight.set_exception(e)
+                # the error is raised to this caller; don't log it as an
+                # unretrieved future exception when nobody else waited
+                in_flight.exception()
+            raise
+        except BaseException:
+            if self._coalesce_queries:
+                del self._queries_in_flight[flight_key]
+                # cancelled: the callers waiting for it run the query again
+                in_flight.set_result(None)
+            raise
+        if self._coalesce_queries:
+            del self._queries_in_flight[flight_key]
+            in_flight.set_result(data)
+
+        if cache_key is not None and not any(
+                'error' in result for result in data.get('results', [])):
+            cache.put(cache_key, data, size, ttl=cache_ttl)
+
+        return self._query_done(query, database, start, data,
+                                raise_errors)
+
+    def prepare(self, query, database=None, epoch=None, params=None):
+        """Prepare a query with ``$name`` bind parameters for repeated use.
+
+        The most recently used prepared queries are kept, so preparing the
+        same query again returns the same :class:`~.PreparedQuery`.
+
+        :param query: the query, with ``$name`` in place of values
+        :type query: str
+        :param database: database to query, defaults to the client's
+            current database
+        :type database: str
+        :param epoch: response timestamps to be in epoch format either 'h',
+            'm', 's', 'ms', 'u', or 'ns', defaults to None
+        :type epoch: str
+        :param params: additional parameters for the requests
+        :type params: dict
+        :returns: the prepared query
+        :rtype: :class:`~.PreparedQuery`
 
-        params['q'] = query
-        params['db'] = database or self._database
+        :Example:
 
-        if epoch is not None:
-            params['epoch'] = epoch
+        ::
 
-        response = yield self.request(
+            >> stmt = client.prepare(
+            ..     "SELECT value FROM example_data WHERE remote_ip = $ip "
+            ..     "AND time > now() - $since")
+            >> res = await stmt.execute({'ip': remote_ip, 'since': '10m'})
+        """
+        database = database or self._database
+        key = (query, database, epoch, tuple(sorted((params or {}).items())))
+        prepared = self._prepared.pop(key, None)
+        if prepared is None:
+            prepared = PreparedQuery(self, query, database, epoch, params)
+        self._prepared[key] = prepared
+        if len(self._prepared) > _PREPARED_CACHE_SIZE:
+            self._prepared.popitem(last=False)
+        return prepared
+
+    def _query_done(self, query, database, start, data, raise_errors):
+        built = time.time()
+        results = self._result_sets(data, raise_errors)
+        end = time.time()
+        self.metrics.observe('result_set', end - built)
+        self.metrics.record_query(query, database, end - start)
+        return results
+
+    async def _query_data(self, params, expected_response_code, codec=None,
+                          encoded=None):
+        codec = codec or self._codec
+        headers = self._query_headers.get(codec.accept)
+        if headers is None:
+            headers = dict(self._headers)
+            headers['Accept'] = codec.accept
+            if self._gzip:
+                headers['Accept-Encoding'] = 'gzip'
+            headers = self._query_headers[codec.accept] = \
+                MappingProxyType(headers)
+
+        response = await self.request(
             url="query",
             method='GET',
-            params=params,
+            params=params if encoded is None else None,
             data=None,
-            expected_response_code=expected_response_code
+            expected_response_code=expected_response_code,
+            headers=headers,
+            encoded_params=encoded
         )
 
-        data = json.loads(response.body)
-
+        body = await self._response_body(response)
+        start = time.time()
+        data = codec.loads(body)
+        self.metrics.observe('decode', time.time() - start)
+        return (data, len(body))
+
+    async def _batched_query(self, query, params, extra,
+                             expected_response_code, codec):
+        batch_key = (params['db'], params.get('epoch'), extra,
+                     expected_response_code, codec)
+        batch = self._query_batches.get(batch_key)
+        if batch is None:
+            batch = self._query_batches[batch_key] = []
+            IOLoop.current().call_later(
+                self._query_batch_window / 1000.0,
+                self._flush_query_batch, batch_key, batch)
+
+        future = Future()
+        batch.append((query, future))
+        if len(batch) >= self._query_batch_size:
+            self._flush_query_batch(batch_key, batch)
+        ret = await future
+        return ret
+
+    def _flush_query_batch(self, batch_key, batch):
+        if self._query_batches.get(batch_key) is not batch:
+            # already sent because it was full
+            return
+        del self._query_batches[batch_key]
+        IOLoop.current().spawn_callback(self._send_query_batch,
+                                        batch_key, batch)
+
+    async def _send_query_batch(self, batch_key, batch):
+        database, epoch, extra, expected_response_code, codec = batch_key
+        # callers cancelled while the batch was collected
+        batch = [(query, future) for query, future in batch
+                 if not future.cancelled()]
+        if not batch:
+            return
+        params = dict(extra)
+        params['db'] = database
+        if epoch is not None:
+            params['epoch'] = epoch
+        params['q'] = ';'.join(query for query, _ in batch)
+
+        def send_alone(query, future):
+            if future.cancelled():
+                return
+            alone = dict(params, q=query)
+            chain_future(convert_yielded(
+                self._query_data(alone, expected_response_code, codec)),
+                future)
+
+        try:
+            data, size = await self._query_data(
+                params, expected_response_code, codec)
+        except Exception as e:
+            if _is_client_error(e) and len(batch) > 1:
+                # one bad statement fails the whole request; retry each
+                # query on its own so the others still get their results
+                for query, future in batch:
+                    send_alone(query, future)
+            else:
+                for _, future in batch:
+                    future_set_exception_unless_cancelled(future, e)
+            return
+
+        results = {}
+        for result in data.get('results', []):
+            results[result.get('statement_id', 0)] = result
+        size //= len(batch)
+        for statement_id, (query, future) in enumerate(batch):
+            result = results.get(statement_id)
+            if result is None or result.get('error') == _NOT_EXECUTED:
+                # InfluxDB stops at the first statement failing at run
+                # time; the statements after it were never run
+                send_alone(query, future)
+                continue
+            result = dict(result, statement_id=0)
+            future_set_result_unless_cancelled(
+                future, ({'results': [result]}, size))
+
+    @staticmethod
+    def _result_sets(data, raise_errors):
         results = [
             ResultSet(result, raise_errors=raise_errors)
             for result
@@ -230,18 +1046,302 @@ class InfluxDBClient(object):
 
         # TODO(aviau): Always return a list. (This would be a breaking change)
         if len(results) == 1:
-            raise Return(results[0])
+            return results[0]
         else:
-            raise Return(results)
+            return results
+
+    async def query_columns(self,
+                            query,
+                            params=None,
+                            epoch=None,
+                            database=None,
+                            raise_errors=True,
+                            codec=None):
+        """Send a query and return its series as NumPy column arrays.
+
+        No per-row objects are built: each series' values are transposed
+        into one array per column. Requires numpy.
+
+        :param query: the actual query string
+        :type query: str
+        :param params: additional parameters for the request, defaults to {}
+        :type params: dict
+        :param epoch: timestamp precision of the returned times; if set,
+            the time column is an int64 array of epochs
+        :type epoch: str
+        :param database: database to query, defaults to None
+        :type database: str
+        :param raise_errors: Whether or not to raise exceptions when InfluxDB
+            returns errors, defaults to True
+        :type raise_errors: bool
+        :param codec: how the response is requested and decoded, 'json',
+            'csv' or a codec instance, defaults to the client's codec
+        :type codec: str or :class:`~.JSONCodec`
+        :returns: for each series a dict with its 'name', its 'tags' and its
+            'columns', a dict of arrays by column name; a list of such lists
+            if the query holds several statements
+        :rtype: list
+
+        :Example:
+
+        ::
+
+            >> series = await client.query_columns(
+            ..     'SELECT value FROM cpu GROUP BY host', epoch='ms')
+            >> series[0]['tags'], series[0]['columns']['value'].mean()
+            ({u'host': u'server01'}, 0.64)
+        """
+        start = time.time()
+        params = dict(params or {})
+        params['q'] = query
+        params['db'] = database or self._database
+        if epoch is not None:
+            params['epoch'] = epoch
+
+        data, _ = await self._query_data(params, 200, get_codec(codec))
+        if raise_errors and 'error' in data:
+            raise InfluxDBClientError(data['error'])
 
-    @coroutine
-    def write(self, data, params=None, expected_response_code=204,
-              protocol='json'):
+        results = [result_columns(result, epoch, raise_errors)
+                   for result in data.get('results', [])]
+        self.metrics.record_query(query, params['db'], time.time() - start)
+        if len(results) == 1:
+            return results[0]
+        return results
+
+    def query_stream(self,
+                     query,
+                     chunk_size=None,
+                     params=None,
+                     epoch=None,
+                     database=None,
+                     raise_errors=True,
+                     raw=False):
+        """Send a query in InfluxDB's chunked mode and stream the results.
+
+        Each newline-delimited JSON chunk is parsed only when it is read
+        from the returned stream, so the response is never held in memory
+        as a whole.
+
+        :param query: the actual query string
+        :type query: str
+        :param chunk_size: maximum number of points per chunk, defaults to
+            the server's setting (10000)
+        :type chunk_size: int
+        :param params: additional parameters for the request, defaults to {}
+        :type params: dict
+        :param epoch: timestamp precision of the returned times
+        :type epoch: str
+        :param database: database to query, defaults to None
+        :type database: str
+        :param raise_errors: Whether or not to raise exceptions when InfluxDB
+            returns errors, defaults to True
+        :type raise_errors: bool
+        :param raw: read the raw result dicts instead of
+            :class:`~.ResultSet` objects, defaults to False
+        :type raw: bool
+        :returns: the stream of partial results
+        :rtype: :class:`~.QueryStream`
+        """
+        params = dict(params or {})
+        params['q'] = query
+        params['db'] = database or self._database
+        params['chunked'] = 'true'
+        if chunk_size:
+            params['chunk_size'] = chunk_size
+        if epoch is not None:
+            params['epoch'] = epoch
+
+        stream = QueryStream(raise_errors=raise_errors, raw=raw)
+        future = convert_yielded(self.request(
+            url="query",
+            method='GET',
+            params=params,
+            data=None,
+            expected_response_code=200,
+            streaming_callback=stream._on_chunk
+        ))
+        IOLoop.current().add_future(future, stream._on_response)
+        return stream
+
+    def _split_queries(self, query, start, end, step, params, **kwargs):
+        if not is_single_statement(query):
+            raise ValueError("Only a single SELECT statement can be split")
+        start, end, step = (_nanoseconds(start), _nanoseconds(end),
+                            _nanoseconds(step))
+        if step <= 0:
+            raise ValueError("step must be positive")
+        ranges = [(t, min(t + step, end)) for t in range(start, end, step)]
+        if is_descending(query):
+            ranges.reverse()
+
+        def sub_query(statement):
+            # query() adds to its params, so each range gets its own copy
+            return lambda: self.query(statement, params=dict(params or {}),
+                                      **kwargs)
+        return [sub_query(with_time_range(query, range_start, range_end))
+                for range_start, range_end in ranges]
+
+    async def query_split(self,
+                          query,
+                          start,
+                          end,
+                          step,
+                          max_concurrency=4,
+                          params=None,
+                          epoch=None,
+                          database=None,
+                          raise_errors=True,
+                          bind_params=None):
+        """Split a query into adjacent time ranges, send them concurrently
+        and merge their series in time order.
+
+        Every range is a copy of the query with ``time >= range start AND
+        time < range end`` added to its WHERE condition. Aggregates, LIMIT
+        and SLIMIT therefore apply per range; with ``GROUP BY time(...)``,
+        use a ``step`` that is a multiple of the interval and a ``start``
+        aligned to it so no bucket is split between two ranges.
+
+        :param query: a single SELECT statement
+        :type query: str
+        :param start: start of the queried time range
+        :type start: datetime, RFC3339 string or int (nanoseconds since
+            the epoch)
+        :param end: end of the queried time range (excluded)
+        :type end: datetime, RFC3339 string or int (nanoseconds since the
+            epoch)
+        :param step: length of each range
+        :type step: timedelta or int (nanoseconds)
+        :param max_concurrency: number of ranges queried at once, defaults
+            to 4
+        :type max_concurrency: int
+        :param params: additional parameters for the requests, defaults to
+            {}
+        :type params: dict
+        :param epoch: timestamp precision of the returned times
+        :type epoch: str
+        :param database: database to query, defaults to None
+        :type database: str
+        :param raise_errors: Whether or not to raise exceptions when InfluxDB
+            returns errors, defaults to True
+        :type raise_errors: bool
+        :param bind_params: values of the query's ``$name`` bind parameters
+        :type bind_params: dict
+        :returns: the merged data of all ranges
+        :rtype: :class:`~.ResultSet`
+
+        :Example:
+
+        ::
+
+            >> result = await client.query_split(
+            ..     'SELECT value FROM cpu WHERE host = $host',
+            ..     datetime(2026, 9, 1), datetime(2026, 10, 1),
+            ..     step=timedelta(days=1), max_concurrency=8,
+            ..     bind_params={'host': 'server01'})
+        """
+        queries = self._split_queries(
+            query, start, end, step, params, epoch=epoch, database=database,
+            raise_errors=raise_errors, bind_params=bind_params)
+        results = [None] * len(queries)
+        pending = iter(enumerate(queries))
+
+        async def worker():
+            # workers share one iterator and each takes the next free range
+            for index, sub_query in pending:
+                results[index] = (await sub_query()).raw
+
+        await multi([worker()
+                     for _ in range(min(max_concurrency, len(queries)))])
+        return ResultSet(_merge_results(results), raise_errors=raise_errors)
+
+    def query_split_stream(self,
+                           query,
+                           start,
+                           end,
+                           step,
+                           max_concurrency=4,
+                           params=None,
+                           epoch=None,
+                           database=None,
+                           raise_errors=True,
+                           bind_params=None):
+        """Split a query into adjacent time ranges like
+        :meth:`query_split`, but read the result of each range in time
+        order instead of merging them.
+
+        Only the ranges being queried ahead of the reader are held in
+        memory. Takes the same arguments as :meth:`query_split`.
+
+        :returns: the stream of range results
+        :rtype: :class:`~.SplitQueryStream`
+        """
+        queries = self._split_queries(
+            query, start, end, step, params, epoch=epoch, database=database,
+            raise_errors=raise_errors, bind_params=bind_params)
+        return SplitQueryStream(queries, max_concurrency)
+
+    def follow(self,
+               query,
+               interval=10000,
+               overlap=0,
+               start=None,
+               callback=None,
+               epoch='ns',
+               database=None,
+               params=None,
+               bind_params=None):
+        """Poll a query and deliver only the new rows of each series.
+
+        After the first poll the query is restricted to the time since the
+        newest row delivered, minus ``overlap``, so each poll downloads the
+        delta instead of the whole window. See :class:`~.QueryFollower`.
+
+        :param query: a single SELECT statement; its own time condition
+            bounds the first poll
+        :type query: str
+        :param interval: milliseconds between polls, defaults to 10000
+        :type interval: int
+        :param overlap: how far before the newest delivered row each poll
+            starts, to catch late-arriving points, defaults to 0
+        :type overlap: timedelta or int (nanoseconds)
+        :param start: where the first poll starts, defaults to None (only
+            the query's own time condition applies)
+        :type start: datetime, RFC3339 string or int (nanoseconds since
+            the epoch)
+        :param callback: called (and awaited, if it returns an awaitable)
+            with each series holding new rows, defaults to None (read them
+            from the returned follower)
+        :type callback: callable
+        :param epoch: timestamp precision of the returned times, defaults
+            to 'ns'
+        :type epoch: str
+        :param database: database to query, defaults to None
+        :type database: str
+        :param params: additional parameters for the requests, defaults to
+            {}
+        :type params: dict
+        :param bind_params: values of the query's ``$name`` bind parameters
+        :type bind_params: dict
+        :returns: the running follower; stop it with
+            :meth:`~.QueryFollower.stop`
+        :rtype: :class:`~.QueryFollower`
+        """
+        follower = QueryFollower(
+            self, query, interval, _nanoseconds(overlap),
+            None if start is None else _nanoseconds(start), callback, epoch,
+            database, params, bind_params)
+        follower.start()
+        return follower
+
+    async def write(self, data, params=None, expected_response_code=204,
+                    protocol='json'):
         """Write data to InfluxDB.
 
         :param data: the data to be written
         :type data: (if protocol is 'json') dict
                     (if protocol is 'line') sequence of line protocol strings
+                    or an already encoded bytes body
         :param params: additional parameters for the request, defaults to None
         :type params: dict
         :param expected_response_code: the expected response code of the write
@@ -249,41 +1349,113 @@ class InfluxDBClient(object):
         :type expected_response_code: int
         :param protocol: protocol of input data, either 'json' or 'line'
         :type protocol: str
-        :returns: True, if the write operation is successful
+        :returns: True, if the write operation is successful or the data was
+            spooled, False if the write limiter dropped it
         :rtype: bool
         """
-
-        headers = self._headers
-        headers['Content-type'] = 'application/octet-stream'
-
+        start = time.time()
         if params:
             precision = params.get('precision')
         else:
             precision = None
 
-        if protocol == 'json':
-            data = make_lines(data, precision).encode('utf-8')
-        elif protocol == 'line':
-            data = ('\n'.join(data) + '\n').encode('utf-8')
+        database = (params or {}).get('db') or self._database
 
-        yield self.request(
-            url="write",
-            method='POST',
-            params=params,
-            data=data,
-            expected_response_code=expected_response_code,
-            headers=headers
-        )
-        raise Return(True)
-
-    @coroutine
-    def _write_points(self,
-                      points,
-                      time_precision,
-                      database,
-                      retention_policy,
-                      tags,
-                      protocol='json'):
+        cache = self._query_cache
+        invalidate = cache is not None and cache.invalidate_on_write
+        schema = self.schema
+        learn = schema is not None and schema.learn_from_writes
+        if invalidate or learn:
+            measurements = _written_measurements(data, protocol)
+        else:
+            measurements = None
+
+        new_fields = None
+        if protocol == 'json':
+            if schema is not None and schema.check_fields:
+                try:
+                    points, new_fields = await schema._check_points(
+                        data['points'], database, None,
+                        data.get('measurement'))
+                except Exception as e:
+                    if not is_server_failure(e):
+                        raise
+                    # the field types could not be loaded; send the write
+                    # unchecked, so it is spooled if the server is down
+                    logger.warning("Field types unavailable, writing "
+                                   "unchecked: %s", e)
+                else:
+                    if points is not data['points']:
+                        data = dict(data, points=points)
+            data = await self._encode(data, precision)
+        elif protocol == 'line' and not isinstance(data, bytes):
+            data = b'\n'.join(
+                line if isinstance(line, bytes) else line.encode('utf-8')
+                for line in data) + b'\n'
+        self.metrics.observe('encode', time.time() - start)
+        points = data.count(b'\n') + (bool(data) and
+                                       not data.endswith(b'\n'))
+
+        spool = self._spool
+        if spool is not None and spool.max_backlog is not None and \
+                self._requests_in_flight['write'] >= spool.max_backlog:
+            spool.append(data, params)
+            self.metrics.record_write(points, time.time() - start)
+            return True
+
+        try:
+            if self._write_limiter is None:
+                await self._send_write(data, params, expected_response_code)
+            elif not await self._write_limiter.submit(
+                    data, params, points, expected_response_code):
+                return False
+        except Exception as e:
+            if spool is None or not is_server_failure(e):
+                raise
+            logger.warning("Write failed, spooling %d bytes: %s",
+                           len(data), e)
+            spool.append(data, params)
+            self.metrics.record_write(points, time.time() - start)
+            return True
+
+        self.metrics.record_write(points, time.time() - start)
+        if learn or new_fields:
+            schema._learn(database, measurements if learn else (),
+                          new_fields)
+        if invalidate and measurements:
+            cache.invalidate(database, measurements)
+        return True
+
+    def _write_url(self, params):
+        baseurl = self._baseurl
+        key = (baseurl, tuple(sorted(params.items())) if params else ())
+        url = self._write_urls.get(key)
+        if url is None:
+            query_string = [self._auth_params] if self._auth_params else []
+            if params:
+                query_string.append(urlencode(params))
+            url = "{0}/write".format(baseurl)
+            if query_string:
+                url += "?" + "&".join(query_string)
+            if len(self._write_urls) >= _WRITE_URL_CACHE_SIZE:
+                self._write_urls.clear()
+            self._write_urls[key] = url
+        return url
+
+    async def _send_write(self, data, params, expected_response_code):
+        if self._gzip:
+            data = await self._compress(data)
+
+        await self._fetch('write', self._write_url(params), 'POST', data,
+                          self._write_headers, expected_response_code)
+
+    async def _write_points(self,
+                            points,
+                            time_precision,
+                            database,
+                            retention_policy,
+                            tags,
+                            protocol='json'):
         if time_precision not in ['n', 'u', 'ms', 's', 'm', 'h', None]:
             raise ValueError(
                 "Invalid time precision is given. "
@@ -309,17 +1481,69 @@ class InfluxDBClient(object):
         if retention_policy is not None:
             params['rp'] = retention_policy
 
-        yield self.write(
+        return await self.write(
                 data=data,
                 params=params,
                 expected_response_code=204,
                 protocol=protocol
             )
 
-        raise Return(True)
+    async def write_columns(self,
+                            measurement,
+                            time=None,
+                            tags=None,
+                            fields=None,
+                            time_precision=None,
+                            database=None,
+                            retention_policy=None):
+        """Write columnar data of one measurement.
+
+        The columns are encoded with NumPy, see
+        :func:`~influxtor.line_protocol.make_lines_columns`.
+
+        :param measurement: the measurement of every row
+        :type measurement: str
+        :param time: timestamps, either integers already in
+            ``time_precision`` or ``datetime64`` values, defaults to None
+        :type time: array-like
+        :param tags: tag values by key, each either a single value shared by
+            all rows or an array-like with one value per row
+        :type tags: dict
+        :param fields: field values by key, each an array-like with one
+            value per row
+        :type fields: dict
+        :param time_precision: either 'n', 'u', 'ms', 's', 'm' or 'h',
+            defaults to None
+        :type time_precision: str
+        :param database: the database to write the points to, defaults to
+            the client's current database
+        :type database: str
+        :param retention_policy: the retention policy for the points
+        :type retention_policy: str
+        :returns: True, if the operation is successful
+        :rtype: bool
 
-    @coroutine
-    def get_list_database(self):
+        :Example:
+
+        ::
+
+            >> await client.write_columns(
+            ..     'cpu_load',
+            ..     time=numpy.array(timestamps, dtype='datetime64[ns]'),
+            ..     tags={'host': hosts, 'region': 'us-west'},
+            ..     fields={'value': values},
+            ..     time_precision='s')
+        """
+        data = make_lines_columns(measurement, time=time, tags=tags,
+                                  fields=fields, precision=time_precision)
+        ret = await self._write_points(points=data,
+                                       time_precision=time_precision,
+                                       database=database,
+                                       retention_policy=retention_policy,
+                                       tags=None, protocol='line')
+        return ret
+
+    async def get_list_database(self):
         """Get the list of databases in InfluxDB.
 
         :returns: all databases in InfluxDB
@@ -333,30 +1557,27 @@ class InfluxDBClient(object):
             >> dbs
             [{u'name': u'db1'}, {u'name': u'db2'}, {u'name': u'db3'}]
         """
-        ret = yield self.query("SHOW DATABASES")
-        raise Return(list(ret.get_points()))
+        ret = await self.query("SHOW DATABASES")
+        return list(ret.get_points())
 
-    @coroutine
-    def create_database(self, dbname):
+    async def create_database(self, dbname):
         """Create a new database in InfluxDB.
 
         :param dbname: the name of the database to create
         :type dbname: str
         """
-        yield self.query("CREATE DATABASE \"%s\"" % dbname)
+        await self.query("CREATE DATABASE \"%s\"" % dbname)
 
-    @coroutine
-    def drop_database(self, dbname):
+    async def drop_database(self, dbname):
         """Drop a database from InfluxDB.
 
         :param dbname: the name of the database to drop
         :type dbname: str
         """
-        yield self.query("DROP DATABASE \"%s\"" % dbname)
+        await self.query("DROP DATABASE \"%s\"" % dbname)
 
-    @coroutine
-    def create_retention_policy(self, name, duration, replication,
-                                database=None, default=False):
+    async def create_retention_policy(self, name, duration, replication,
+                                      database=None, default=False):
         """Create a retention policy for a database.
 
         :param name: the name of the new retention policy
@@ -384,11 +1605,11 @@ class InfluxDBClient(object):
         if default is True:
             query_string += " DEFAULT"
 
-        yield self.query(query_string)
+        await self.query(query_string)
 
-    @coroutine
-    def alter_retention_policy(self, name, database=None,
-                               duration=None, replication=None, default=None):
+    async def alter_retention_policy(self, name, database=None,
+                                     duration=None, replication=None,
+                                     default=None):
         """Mofidy an existing retention policy for a database.
 
         :param name: the name of the retention policy to modify
@@ -422,10 +1643,9 @@ class InfluxDBClient(object):
         if default is True:
             query_string += " DEFAULT"
 
-        yield self.query(query_string)
+        await self.query(query_string)
 
-    @coroutine
-    def drop_retention_policy(self, name, database=None):
+    async def drop_retention_policy(self, name, database=None):
         """Drop an existing retention policy for a database.
 
         :param name: the name of the retention policy to drop
@@ -437,10 +1657,9 @@ class InfluxDBClient(object):
         query_string = (
             "DROP RETENTION POLICY {0} ON {1}"
         ).format(quote_ident(name), quote_ident(database or self._database))
-        yield self.query(query_string)
+        await self.query(query_string)
 
-    @coroutine
-    def get_list_retention_policies(self, database=None):
+    async def get_list_retention_policies(self, database=None):
         """Get the list of retention policies for a database.
 
         :param database: the name of the database, defaults to the client's
@@ -460,13 +1679,12 @@ class InfluxDBClient(object):
               u'name': u'default',
               u'replicaN': 1}]
             """
-        rsp = yield self.query(
+        rsp = await self.query(
             "SHOW RETENTION POLICIES ON \"%s\"" % (database or self._database)
         )
-        raise Return(list(rsp.get_points()))
+        return list(rsp.get_points())
 
-    @coroutine
-    def get_list_users(self):
+    async def get_list_users(self):
         """Get the list of all users in InfluxDB.
 
         :returns: all users in InfluxDB
@@ -482,11 +1700,10 @@ class InfluxDBClient(object):
              {u'admin': False, u'user': u'user2'},
              {u'admin': False, u'user': u'user3'}]
         """
-        ret = yield self.query("SHOW USERS")
-        raise Return(list(ret.get_points()))
+        ret = await self.query("SHOW USERS")
+        return list(ret.get_points())
 
-    @coroutine
-    def create_user(self, username, password, admin=False):
+    async def create_user(self, username, password, admin=False):
         """Create a new user in InfluxDB
 
         :param username: the new username to create
@@ -501,20 +1718,18 @@ class InfluxDBClient(object):
             quote_ident(username), quote_literal(password))
         if admin:
             text += ' WITH ALL PRIVILEGES'
-        yield self.query(text)
+        await self.query(text)
 
-    @coroutine
-    def drop_user(self, username):
+    async def drop_user(self, username):
         """Drop a user from InfluxDB.
 
         :param username: the username to drop
         :type username: str
         """
         text = "DROP USER {0}".format(quote_ident(username))
-        yield self.query(text)
+        await self.query(text)
 
-    @coroutine
-    def set_user_password(self, username, password):
+    async def set_user_password(self, username, password):
         """Change the password of an existing user.
 
         :param username: the username who's password is being changed
@@ -524,10 +1739,9 @@ class InfluxDBClient(object):
         """
         text = "SET PASSWORD FOR {0} = {1}".format(
             quote_ident(username), quote_literal(password))
-        yield self.query(text)
+        await self.query(text)
 
-    @coroutine
-    def delete_series(self, database=None, measurement=None, tags=None):
+    async def delete_series(self, database=None, measurement=None, tags=None):
         """Delete series from a database. Series can be filtered by
         measurement and tags.
 
@@ -548,10 +1762,9 @@ class InfluxDBClient(object):
             tag_eq_list = ["{0}={1}".format(quote_ident(k), quote_literal(v))
                            for k, v in tags.items()]
             query_str += ' WHERE ' + ' AND '.join(tag_eq_list)
-        yield self.query(query_str, database=database)
+        await self.query(query_str, database=database)
 
-    @coroutine
-    def grant_admin_privileges(self, username):
+    async def grant_admin_privileges(self, username):
         """Grant cluster administration privileges to a user.
 
         :param username: the username to grant privileges to
@@ -561,10 +1774,9 @@ class InfluxDBClient(object):
             and manage users.
         """
         text = "GRANT ALL PRIVILEGES TO {0}".format(quote_ident(username))
-        yield self.query(text)
+        await self.query(text)
 
-    @coroutine
-    def revoke_admin_privileges(self, username):
+    async def revoke_admin_privileges(self, username):
         """Revoke cluster administration privileges from a user.
 
         :param username: the username to revoke privileges from
@@ -574,10 +1786,9 @@ class InfluxDBClient(object):
             and manage users.
         """
         text = "REVOKE ALL PRIVILEGES FROM {0}".format(quote_ident(username))
-        yield self.query(text)
+        await self.query(text)
 
-    @coroutine
-    def grant_privilege(self, privilege, database, username):
+    async def grant_privilege(self, privilege, database, username):
         """Grant a privilege on a database to a user.
 
         :param privilege: the privilege to grant, one of 'read', 'write'
@@ -591,10 +1802,9 @@ class InfluxDBClient(object):
         text = "GRANT {0} ON {1} TO {2}".format(privilege,
                                                 quote_ident(database),
                                                 quote_ident(username))
-        yield self.query(text)
+        await self.query(text)
 
-    @coroutine
-    def revoke_privilege(self, privilege, database, username):
+    async def revoke_privilege(self, privilege, database, username):
         """Revoke a privilege on a database from a user.
 
         :param privilege: the privilege to revoke, one of 'read', 'write'
@@ -608,10 +1818,9 @@ class InfluxDBClient(object):
         text = "REVOKE {0} ON {1} FROM {2}".format(privilege,
                                                    quote_ident(database),
                                                    quote_ident(username))
-        yield self.query(text)
+        await self.query(text)
 
-    @coroutine
-    def get_list_privileges(self, username):
+    async def get_list_privileges(self, username):
         """Get the list of all privileges granted to given user.
 
         :param username: the username to get privileges of
@@ -631,5 +1840,5 @@ class InfluxDBClient(object):
              {u'privilege': u'NO PRIVILEGES', u'database': u'db3'}]
         """
         text = "SHOW GRANTS FOR {0}".format(quote_ident(username))
-        ret = yield self.query(text)
-        raise Return(list(ret.get_points()))
+        ret = await self.query(text)
+        return list(ret.get_points())
@@ -0,0 +1,235 @@
+# coding:utf-8
+
+import logging
+
+from tornado.gen import multi
+from tornado.ioloop import PeriodicCallback
+
+from .client import InfluxDBClient, _client_kwargs
+from .exceptions import InfluxDBServerError, is_server_failure
+
+
+logger = logging.getLogger(__name__)
+
+
+class _Node(object):
+
+    def __init__(self, client):
+        self.client = client
+        self.healthy = True
+        self.outstanding = 0
+
+    @property
+    def name(self):
+        return "%s:%s" % (self.client._host, self.client._port)
+
+
+class ClusterClient(object):
+    """Client for several InfluxDB nodes serving the same data.
+
+    Queries go to one healthy node, chosen round-robin or by the fewest
+    outstanding requests, and fail over to the next node on connection or
+    server errors. Writes are sent to every healthy node at once. Nodes
+    failing a request or a ``/ping`` health check are ejected and brought
+    back by the health check once they answer again.
+
+    :param hosts: the nodes, as ``'host:port'`` strings or
+        ``(host, port)`` tuples
+    :type hosts: list
+    :param balance: how queries pick a node, 'round_robin' or
+        'least_outstanding', defaults to 'round_robin'
+    :type balance: str
+    :param write_consistency: how many nodes must acknowledge a write:
+        'all', 'quorum' (a majority of all nodes) or 'one', defaults to
+        'all'
+    :type write_consistency: str
+    :param health_check_interval: milliseconds between ``/ping`` checks of
+        all nodes, defaults to 5000. None or 0 disables health checks, and
+        ejected nodes then stay out
+    :type health_check_interval: int
+
+    Other keyword arguments are passed to every node's
+    :class:`~.InfluxDBClient`. ``spool``, ``write_limiter`` and ``schema``
+    belong to a single client, so they are given as functions called with
+    each node's ``'host:port'`` name to create its own.
+
+    :Example:
+
+    ::
+
+        >> cluster = ClusterClient(['influx1:8086', 'influx2:8086'],
+        ..                         database='metrics',
+        ..                         write_consistency='quorum',
+        ..                         spool=lambda host: WriteSpool(
+        ..                             '/var/spool/influxtor/' + host))
+        >> await cluster.write_points(points)
+        >> result = await cluster.query('SELECT * FROM cpu')
+    """
+
+    def __init__(self,
+                 hosts,
+                 balance='round_robin',
+                 write_consistency='all',
+                 health_check_interval=5000,
+                 **kwargs):
+        if balance not in ('round_robin', 'least_outstanding'):
+            raise ValueError("Invalid balance is given. "
+                             "(use 'round_robin' or 'least_outstanding')")
+        if write_consistency not in ('all', 'quorum', 'one'):
+            raise ValueError("Invalid write_consistency is given. "
+                             "(use 'all', 'quorum' or 'one')")
+        if not hosts:
+            raise ValueError("At least one host is required")
+
+        self._nodes = []
+        for host in hosts:
+            if isinstance(host, (tuple, list)):
+                host, port = host
+            elif ':' in host:
+                host, port = host.rsplit(':', 1)
+            else:
+                port = 8086
+            name = "%s:%s" % (host, port)
+            self._nodes.append(_Node(InfluxDBClient(
+                host, port, **_client_kwargs(kwargs, name))))
+
+        self._balance = balance
+        self._write_consistency = write_consistency
+        self._health_check_interval = health_check_interval
+        self._health_check = None
+        self._next = 0
+
+    @property
+    def nodes(self):
+        """The state of every node.
+
+        :rtype: list of dicts with 'node', 'healthy' and 'outstanding' keys
+        """
+        return [{'node': node.name,
+                 'healthy': node.healthy,
+                 'outstanding': node.outstanding} for node in self._nodes]
+
+    def _start_health_check(self):
+        if self._health_check is None and self._health_check_interval:
+            self._health_check = PeriodicCallback(
+                self.check_health, self._health_check_interval)
+            self._health_check.start()
+
+    async def check_health(self):
+        """Ping every node and update which ones are healthy."""
+        await multi([self._ping(node) for node in self._nodes])
+
+    async def _ping(self, node):
+        try:
+            await node.client.ping()
+        except Exception as e:
+            self._eject(node, e)
+        else:
+            if not node.healthy:
+                logger.info("InfluxDB node %s is back", node.name)
+            node.healthy = True
+
+    def _eject(self, node, error):
+        if node.healthy:
+            logger.warning("Ejecting InfluxDB node %s: %s", node.name, error)
+        node.healthy = False
+
+    def _query_order(self):
+        healthy = [node for node in self._nodes if node.healthy]
+        if not healthy:
+            # better to try ejected nodes than to fail without trying
+            healthy = list(self._nodes)
+        if self._balance == 'least_outstanding':
+            return sorted(healthy, key=lambda node: node.outstanding)
+        self._next = (self._next + 1) % len(healthy)
+        return healthy[self._next:] + healthy[:self._next]
+
+    async def _call(self, node, method, *args, **kwargs):
+        node.outstanding += 1
+        try:
+            ret = await getattr(node.client, method)(*args, **kwargs)
+        except Exception as e:
+            if is_server_failure(e):
+                self._eject(node, e)
+            raise
+        finally:
+            node.outstanding -= 1
+        return ret
+
+    async def query(self, *args, **kwargs):
+        """Send a query to one node, failing over to the others.
+
+        Takes the same arguments as :meth:`InfluxDBClient.query`.
+        """
+        self._start_health_check()
+        error = None
+        for node in self._query_order():
+            try:
+                ret = await self._call(node, 'query', *args, **kwargs)
+            except Exception as e:
+                if not is_server_failure(e):
+                    raise
+                error = e
+            else:
+                return ret
+        raise error
+
+    async def _write_all(self, method, *args, **kwargs):
+        self._start_health_check()
+        required = {
+            'all': len(self._nodes),
+            'quorum': len(self._nodes) // 2 + 1,
+            'one': 1,
+        }[self._write_consistency]
+
+        nodes = [node for node in self._nodes if node.healthy]
+        if len(nodes) < required:
+            raise InfluxDBServerError(
+                "%d of %d nodes are healthy, %d required" % (
+                    len(nodes), len(self._nodes), required))
+
+        errors = []
+
+        async def write(node):
+            try:
+                await self._call(node, method, *args, **kwargs)
+            except Exception as e:
+                errors.append((node, e))
+
+        await multi([write(node) for node in nodes])
+
+        acknowledged = len(nodes) - len(errors)
+        if acknowledged < required:
+            for _, error in errors:
+                if not is_server_failure(error):
+                    raise error
+            raise InfluxDBServerError(
+                "write acknowledged by %d of %d nodes, %d required: %s" % (
+                    acknowledged, len(self._nodes), required,
+                    "; ".join("%s: %s" % (node.name, error)
+                              for node, error in errors)))
+        return True
+
+    async def write_points(self, *args, **kwargs):
+        """Write points to the healthy nodes.
+
+        Takes the same arguments as :meth:`InfluxDBClient.write_points`.
+        """
+        ret = await self._write_all('write_points', *args, **kwargs)
+        return ret
+
+    async def write(self, *args, **kwargs):
+        """Write data to the healthy nodes.
+
+        Takes the same arguments as :meth:`InfluxDBClient.write`.
+        """
+        ret = await self._write_all('write', *args, **kwargs)
+        return ret
+
+    def close(self):
+        """Stop the health checks and close every node's client."""
+        if self._health_check is not None:
+            self._health_check.stop()
+            self._health_check = None
+        for node in self._nodes:
+            node.client.close()
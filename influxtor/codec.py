@@ -0,0 +1,202 @@
+# coding:utf-8
+"""Codecs decoding query responses.
+
+:class:`JSONCodec` uses orjson or ujson when one of them is installed and
+the standard library's json module otherwise. :class:`CSVCodec` asks
+InfluxDB for ``application/csv`` responses.
+"""
+
+import csv
+import io
+import json
+import re
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+
+_JSON_BACKENDS = {'json': (json.loads, json.dumps)}
+if ujson is not None:
+    _JSON_BACKENDS['ujson'] = (ujson.loads, ujson.dumps)
+if orjson is not None:
+    _JSON_BACKENDS['orjson'] = (orjson.loads, orjson.dumps)
+
+# unescaped commas and equal signs of a series' tag set
+_TAG_SEPARATOR = re.compile(r'(?<!\\),')
+_TAG_ASSIGN = re.compile(r'(?<!\\)=')
+_TAG_UNESCAPE = re.compile(r'\\([,= ])')
+
+
+def _fastest_json():
+    for backend in ('orjson', 'ujson', 'json'):
+        if backend in _JSON_BACKENDS:
+            return backend
+
+
+class JSONCodec(object):
+    """Decode JSON responses.
+
+    :param backend: 'orjson', 'ujson' or 'json', defaults to the fastest one
+        installed
+    :type backend: str
+    """
+
+    format = 'json'
+    accept = 'application/json'
+
+    def __init__(self, backend=None):
+        backend = backend or _fastest_json()
+        if backend not in _JSON_BACKENDS:
+            raise ValueError("JSON backend %r is not installed" % backend)
+        self.backend = backend
+        self._loads, self._dumps = _JSON_BACKENDS[backend]
+
+    def loads(self, body):
+        """Decode a response body into the parsed query response."""
+        return self._loads(body)
+
+    def dumps(self, data):
+        """Encode a request body."""
+        return self._dumps(data)
+
+
+def _csv_rows(body):
+    if isinstance(body, bytes):
+        body = body.decode('utf-8')
+    return csv.reader(io.StringIO(body, newline=''))
+
+
+def _csv_tags(tags):
+    if not tags:
+        return None
+    parsed = {}
+    for pair in _TAG_SEPARATOR.split(tags):
+        key, value = _TAG_ASSIGN.split(pair, 1)
+        parsed[_TAG_UNESCAPE.sub(r'\1', key)] = \
+            _TAG_UNESCAPE.sub(r'\1', value)
+    return parsed
+
+
+def _text(cell):
+    return cell
+
+
+def _bool(cell):
+    if cell == 'true':
+        return True
+    if cell == 'false':
+        return False
+    raise ValueError(cell)
+
+
+_CONVERTERS = (int, float, _bool, _text)
+
+
+class _CSVValues(object):
+    """Convert the cells of rows sharing a header.
+
+    The type found for a column is tried first on its next cells, which
+    saves the failed conversions of guessing each cell's type from scratch.
+    """
+
+    def __init__(self, width):
+        self._converters = [None] * width
+
+    def convert(self, cells):
+        values = []
+        converters = self._converters
+        for i, cell in enumerate(cells):
+            if cell == '':
+                values.append(None)
+                continue
+            converter = converters[i]
+            if converter is not None:
+                try:
+                    values.append(converter(cell))
+                    continue
+                except ValueError:
+                    pass
+            for converter in _CONVERTERS:
+                try:
+                    values.append(converter(cell))
+                except ValueError:
+                    continue
+                converters[i] = converter
+                break
+        return values
+
+
+class CSVCodec(JSONCodec):
+    """Decode ``application/csv`` responses.
+
+    CSV responses are smaller than JSON ones for wide results. Rows are
+    parsed one at a time into the same structure a JSON response has, so
+    the results work with everything that takes JSON ones. CSV is untyped:
+    cells looking like numbers or booleans are returned as such, empty
+    cells as None, and whole floats may come back as ints.
+
+    The response carries no statement ids, so all series are returned as
+    the result of a single statement, and queries are not batched into
+    multi-statement requests (see ``query_batch_window``) with this codec.
+    Request bodies are still encoded as JSON.
+
+    :param backend: the JSON backend used for request bodies
+    :type backend: str
+    """
+
+    format = 'csv'
+    accept = 'application/csv'
+
+    def loads(self, body):
+        series = []
+        header = None
+        values = None
+        current = None
+        current_key = None
+        rows = _csv_rows(body)
+        for row in rows:
+            if not row:
+                # a blank line comes before a new header
+                header = None
+                current = None
+                continue
+            if header is None:
+                if row == ['error']:
+                    return {'error': next(rows, [''])[0]}
+                header = row
+                values = _CSVValues(len(header) - 2)
+                continue
+            key = (row[0], row[1])
+            if current is None or key != current_key:
+                current_key = key
+                current = {'name': row[0], 'columns': list(header[2:]),
+                           'values': []}
+                tags = _csv_tags(row[1])
+                if tags:
+                    current['tags'] = tags
+                series.append(current)
+            current['values'].append(values.convert(row[2:]))
+        result = {'statement_id': 0}
+        if series:
+            result['series'] = series
+        return {'results': [result]}
+
+
+_CODECS = {'json': JSONCodec, 'csv': CSVCodec}
+
+
+def get_codec(codec):
+    """Return the codec for a name ('json' or 'csv') or a codec instance."""
+    if codec is None or isinstance(codec, JSONCodec):
+        return codec
+    try:
+        return _CODECS[codec]()
+    except KeyError:
+        raise ValueError("Invalid codec is given. (use 'json' or 'csv')")
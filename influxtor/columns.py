@@ -0,0 +1,73 @@
+# coding:utf-8
+"""Decode query results into per-column NumPy arrays."""
+
+from numbers import Number
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .exceptions import InfluxDBClientError
+
+
+def _column_array(values):
+    array = np.array(values)
+    if array.dtype != object:
+        return array
+    # nulls turn numeric columns into object arrays; use NaN instead
+    if all(value is None or
+           (isinstance(value, Number) and not isinstance(value, bool))
+           for value in values):
+        return np.array([np.nan if value is None else value
+                         for value in values], dtype=np.float64)
+    return array
+
+
+def series_columns(series, epoch=None):
+    """Turn one series of a query result into column arrays.
+
+    :param series: a series dict with 'name', 'columns', 'values' and
+        optional 'tags', as found in a query response
+    :type series: dict
+    :param epoch: the epoch the query was sent with; if set, the time
+        column is returned as int64
+    :type epoch: str
+    :returns: a dict with the series 'name', its 'tags' dict and its
+        'columns', a dict of NumPy arrays by column name
+    :rtype: dict
+    """
+    if np is None:
+        raise ImportError("series_columns requires numpy")
+    names = series.get('columns', [])
+    values = series.get('values') or []
+    if values:
+        transposed = zip(*values)
+    else:
+        transposed = [()] * len(names)
+
+    columns = {}
+    for name, column in zip(names, transposed):
+        if name == 'time' and epoch is not None:
+            columns[name] = np.array(column, dtype=np.int64)
+        else:
+            columns[name] = _column_array(list(column))
+    return {
+        'name': series.get('name'),
+        'tags': series.get('tags') or {},
+        'columns': columns,
+    }
+
+
+def result_columns(result, epoch=None, raise_errors=True):
+    """Turn every series of one statement's result into column arrays.
+
+    :param result: one entry of a query response's 'results' list
+    :type result: dict
+    :returns: one :func:`series_columns` dict per series
+    :rtype: list
+    """
+    if raise_errors and 'error' in result:
+        raise InfluxDBClientError(result['error'])
+    return [series_columns(series, epoch)
+            for series in result.get('series', [])]
@@ -0,0 +1,74 @@
+# coding:utf-8
+
+import socket
+
+from tornado.httpclient import HTTPError
+
+
+class InfluxDBClientError(Exception):
+    """Raised when an error occurs in the request."""
+    def __init__(self, content, code=None):
+        if isinstance(content, type(b'')):
+            content = content.decode('UTF-8', 'replace')
+
+        if code is not None:
+            message = "%s: %s" % (code, content)
+        else:
+            message = content
+
+        super(InfluxDBClientError, self).__init__(
+            message
+        )
+        self.content = content
+        self.code = code
+
+
+class InfluxDBFieldTypeError(InfluxDBClientError):
+    """Raised before a write whose field value does not match the type the
+    field has in InfluxDB."""
+    def __init__(self, measurement, field, expected, value):
+        super(InfluxDBFieldTypeError, self).__init__(
+            "field %r of measurement %r is of type %s, got %r" % (
+                field, measurement, expected, value))
+        self.measurement = measurement
+        self.field = field
+        self.expected = expected
+        self.value = value
+
+
+class InfluxDBServerError(Exception):
+    """Raised when a server error occurs."""
+    def __init__(self, content):
+        super(InfluxDBServerError, self).__init__(content)
+
+
+class InfluxDBCircuitOpenError(InfluxDBServerError):
+    """Raised without sending the request while the circuit is open."""
+
+
+class InfluxDBPartialWriteError(Exception):
+    """Raised when some batches of a batched write failed."""
+    def __init__(self, failures, batch_count):
+        super(InfluxDBPartialWriteError, self).__init__(
+            "%d of %d batches failed: %s" % (
+                len(failures), batch_count,
+                "; ".join("batch %d: %s" % (index, error)
+                          for index, _, error in failures))
+        )
+        #: list of ``(batch_index, batch, exception)`` tuples
+        self.failures = failures
+        self.batch_count = batch_count
+
+
+def is_server_failure(error):
+    """Whether an error means the server, not the request, is at fault.
+
+    These are server errors, timeouts and connection errors, after which
+    the same request may succeed later or on another server.
+    """
+    if isinstance(error, InfluxDBServerError):
+        return True
+    if isinstance(error, HTTPError):
+        # 599 is tornado's code for timeouts and connection errors
+        return error.code >= 500
+    return isinstance(error, (socket.error, IOError, OSError))
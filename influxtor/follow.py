@@ -0,0 +1,198 @@
+# coding:utf-8
+
+import inspect
+import logging
+from collections import deque
+
+from tornado.gen import sleep
+from tornado.ioloop import IOLoop
+from tornado.locks import Condition
+
+from .influxql import is_single_statement, with_time_range
+
+
+logger = logging.getLogger(__name__)
+
+_EPOCH_NANOS = {
+    'ns': 1,
+    'u': 10 ** 3,
+    'ms': 10 ** 6,
+    's': 10 ** 9,
+    'm': 60 * 10 ** 9,
+    'h': 3600 * 10 ** 9,
+}
+
+
+class QueryFollower(object):
+    """Poll a query and deliver only the rows not delivered before.
+
+    Every series keeps a watermark, the newest time delivered for it. After
+    the first poll, the query is restricted to ``time >=`` the newest
+    watermark of all series minus ``overlap``, so a poll only downloads the
+    points since the previous one. Rows in the overlap that were already
+    delivered unchanged are skipped; a late point or a changed row (such as
+    the still open bucket of a ``GROUP BY time(...)`` aggregate) is
+    delivered again.
+
+    New rows are delivered per series, as raw series dicts with only the
+    new rows in ``values``, to ``callback`` or, without a callback, to
+    readers of :meth:`read` and ``async for``.
+
+    Create followers with :meth:`InfluxDBClient.follow`.
+
+    :Example:
+
+    ::
+
+        >> follower = client.follow(
+        ..     'SELECT value FROM cpu WHERE time > now() - 5m GROUP BY host',
+        ..     interval=5000, overlap=timedelta(seconds=30))
+        >> async for series in follower:
+        ..     check(series['tags'], series['values'])
+    """
+
+    def __init__(self,
+                 client,
+                 query,
+                 interval,
+                 overlap,
+                 start,
+                 callback,
+                 epoch,
+                 database,
+                 params,
+                 bind_params):
+        if not is_single_statement(query):
+            raise ValueError("Only a single SELECT statement can be followed")
+        if epoch not in _EPOCH_NANOS:
+            raise ValueError("Invalid epoch is given. "
+                             "(use 'ns', 'u', 'ms', 's', 'm' or 'h')")
+        self._client = client
+        self._query = query
+        self._interval = interval
+        self._overlap = overlap
+        self._bound = start
+        self._callback = callback
+        self._epoch = epoch
+        self._unit = _EPOCH_NANOS[epoch]
+        self._database = database
+        self._params = params
+        self._bind_params = bind_params
+
+        self.polls = 0
+        self.errors = 0
+        self.rows = 0
+
+        self._seen = {}
+        self._watermarks = {}
+        self._pending = deque()
+        self._condition = Condition()
+        self._running = False
+
+    @property
+    def watermarks(self):
+        """The newest time delivered per series.
+
+        :rtype: dict of ``(name, tags)`` tuples to times in ``epoch`` units,
+            tags being a sorted tuple of ``(key, value)`` pairs
+        """
+        return dict(self._watermarks)
+
+    def start(self):
+        """Start polling; called by :meth:`InfluxDBClient.follow`."""
+        if not self._running:
+            self._running = True
+            IOLoop.current().spawn_callback(self._run)
+
+    def stop(self):
+        """Stop polling; readers get the rows already delivered, then the
+        end of the iteration."""
+        self._running = False
+        self._condition.notify_all()
+
+    async def _run(self):
+        while self._running:
+            try:
+                await self.poll()
+            except Exception:
+                self.errors += 1
+                logger.exception("Poll of followed query failed")
+            await sleep(self._interval / 1000.0)
+
+    async def poll(self):
+        """Query once and deliver the new rows.
+
+        :returns: the number of new rows
+        :rtype: int
+        """
+        query = self._query
+        if self._bound is not None:
+            query = with_time_range(query, self._bound)
+        result = await self._client.query(
+            query, params=dict(self._params or {}), epoch=self._epoch,
+            database=self._database, bind_params=self._bind_params,
+            cache_ttl=0)
+        self.polls += 1
+
+        new_series = []
+        for series in result.raw.get('series', []):
+            key = (series.get('name'),
+                   tuple(sorted((series.get('tags') or {}).items())))
+            seen = self._seen.setdefault(key, {})
+            values = []
+            for row in series.get('values', []):
+                time, row = row[0], tuple(row)
+                if seen.get(time) != row:
+                    seen[time] = row
+                    values.append(list(row))
+            if values:
+                watermark = max(self._watermarks.get(key, values[0][0]),
+                                max(row[0] for row in values))
+                self._watermarks[key] = watermark
+                new_series.append(dict(series, values=values))
+
+        if self._watermarks:
+            bound = (max(self._watermarks.values()) * self._unit -
+                     self._overlap)
+            if self._bound is None or bound > self._bound:
+                self._bound = bound
+            floor = self._bound // self._unit
+            for seen in self._seen.values():
+                for time in [time for time in seen if time < floor]:
+                    del seen[time]
+
+        rows = sum(len(series['values']) for series in new_series)
+        self.rows += rows
+        for series in new_series:
+            if self._callback is not None:
+                ret = self._callback(series)
+                if inspect.isawaitable(ret):
+                    await ret
+            else:
+                self._pending.append(series)
+        if new_series and self._callback is None:
+            self._condition.notify_all()
+        return rows
+
+    async def read(self):
+        """Read the next series with new rows, waiting for the next polls
+        if needed.
+
+        :returns: a series dict with only its new rows in ``values``, or
+            None once the follower was stopped and everything was read
+        :rtype: dict
+        """
+        while not self._pending:
+            if not self._running:
+                return None
+            await self._condition.wait()
+        return self._pending.popleft()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        series = await self.read()
+        if series is None:
+            raise StopAsyncIteration
+        return series
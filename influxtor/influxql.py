@@ -0,0 +1,118 @@
+# coding:utf-8
+"""Helpers that inspect InfluxQL query text."""
+
+import re
+
+
+_READ_ONLY = re.compile(r'^\s*(SELECT|SHOW)\b', re.IGNORECASE)
+_INTO = re.compile(r'\bINTO\b', re.IGNORECASE)
+_PART = r'(?:"(?:[^"\\]|\\.)*"|\w+)'
+_IDENT = r'(?:/(?:[^/\\]|\\.)*/|%s(?:\.+%s)*)' % (_PART, _PART)
+_FROM = re.compile(r'\bFROM\s+(%s(?:\s*,\s*%s)*)' % (_IDENT, _IDENT),
+                   re.IGNORECASE)
+_FROM_NAME = re.compile(_IDENT)
+_STRING_OR_SEMICOLON = re.compile(r'"(?:[^"\\]|\\.)*"|'
+                                  r"'(?:[^'\\]|\\.)*'|;")
+
+
+def is_read_only(query):
+    """Whether the query only reads data (SELECT without INTO, or SHOW)."""
+    return bool(_READ_ONLY.match(query)) and not _INTO.search(query)
+
+
+def is_single_statement(query):
+    """Whether the query holds a single statement."""
+    for match in _STRING_OR_SEMICOLON.finditer(query):
+        if match.group(0) == ';' and query[match.end():].strip():
+            return False
+    return True
+
+
+def measurements(query):
+    """Return the measurements a query reads from.
+
+    :returns: the measurement names; None stands for a regular expression
+        that may match any measurement
+    :rtype: set
+    """
+    names = set()
+    for match in _FROM.finditer(query):
+        for name in _FROM_NAME.findall(match.group(1)):
+            if name.startswith('/'):
+                names.add(None)
+                continue
+            # keep the last part of db.rp.measurement
+            name = re.findall(_PART, name)[-1]
+            if name.startswith('"'):
+                name = name[1:-1].replace('\\"', '"').replace('\\\\', '\\')
+            names.add(name)
+    return names
+
+
+_CLAUSES = re.compile(
+    r'"(?:[^"\\]|\\.)*"|'
+    r"'(?:[^'\\]|\\.)*'|"
+    r'(?<=[=!]~)\s*/(?:[^/\\]|\\.)*/|'
+    r'\bFROM\s+/(?:[^/\\]|\\.)*/|'
+    r'[();]|'
+    r'\b(?:WHERE|GROUP\s+BY|ORDER\s+BY|LIMIT|OFFSET|SLIMIT|SOFFSET|FILL|'
+    r'TZ)\b',
+    re.IGNORECASE)
+_ORDER_DESC = re.compile(r'\bORDER\s+BY\s+time\s+DESC\b', re.IGNORECASE)
+
+
+def with_time_range(query, start, end=None):
+    """Restrict a single SELECT statement to ``start <= time < end``.
+
+    The range is ANDed with the statement's own WHERE condition, so a time
+    condition already in the query still applies. Subqueries are left as
+    they are.
+
+    :param query: the SELECT statement
+    :type query: str
+    :param start: start of the range in nanoseconds since the epoch
+    :type start: int
+    :param end: end of the range (excluded) in nanoseconds since the
+        epoch, defaults to None (no end)
+    :type end: int
+    :rtype: str
+    """
+    depth = 0
+    where = None
+    clause = len(query)
+    for match in _CLAUSES.finditer(query):
+        token = match.group(0)
+        if token == '(':
+            depth += 1
+        elif token == ')':
+            depth -= 1
+        elif token == ';':
+            clause = match.start()
+            break
+        elif depth == 0 and token[0] not in '"\'/ ' and \
+                not token.upper().startswith('FROM'):
+            if token.upper() == 'WHERE':
+                where = match
+            else:
+                clause = match.start()
+                break
+
+    condition = 'time >= %d' % start
+    if end is not None:
+        condition += ' AND time < %d' % end
+    if where is not None:
+        condition = '(%s) AND %s' % (
+            query[where.end():clause].strip(), condition)
+        head = query[:where.start()]
+    else:
+        head = query[:clause]
+    statement = '%s WHERE %s' % (head.rstrip(), condition)
+    tail = query[clause:].strip()
+    if tail:
+        statement += ' ' + tail
+    return statement
+
+
+def is_descending(query):
+    """Whether the query orders its points by descending time."""
+    return bool(_ORDER_DESC.search(query))
@@ -0,0 +1,430 @@
+# coding:utf-8
+"""Line protocol encoder.
+
+Produces the same bytes as ``influxdb.line_protocol.make_lines(...)
+.encode('utf-8')`` but memoizes the escaped measurement, tag and field key
+strings and the sorted tag set prefix of every series, and builds each line
+from pre-encoded byte strings.
+"""
+
+from datetime import datetime
+from numbers import Integral
+
+from dateutil.parser import parse
+from pytz import UTC
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+text_type = str
+integer_types = (int,)
+
+# only strings are memoized: 1, 1.0 and True are equal dict keys but
+# encode differently
+_STRING_TYPES = frozenset([bytes, text_type])
+
+
+EPOCH = UTC.localize(datetime.utcfromtimestamp(0))
+
+
+def _text(data):
+    if isinstance(data, bytes):
+        return data.decode('utf-8')
+    if data is None:
+        return u''
+    return text_type(data)
+
+
+def _escape_tag(tag):
+    return _text(tag).replace(
+        u"\\", u"\\\\"
+    ).replace(
+        u" ", u"\\ "
+    ).replace(
+        u",", u"\\,"
+    ).replace(
+        u"=", u"\\="
+    ).replace(
+        u"\n", u"\\n"
+    )
+
+
+def _quote_string(value):
+    return u"\"{0}\"".format(value
+                             .replace(u"\\", u"\\\\")
+                             .replace(u"\"", u"\\\"")
+                             .replace(u"\n", u"\\n"))
+
+
+def _is_float(value):
+    try:
+        float(value)
+    except (TypeError, ValueError):
+        return False
+    return True
+
+
+def _encode_value(value):
+    if value is None:
+        return b''
+    if isinstance(value, bytes):
+        value = value.decode('utf-8')
+    if isinstance(value, text_type):
+        return _quote_string(value).encode('utf-8')
+    if isinstance(value, bool):
+        return b'True' if value else b'False'
+    if isinstance(value, integer_types):
+        return str(value).encode('ascii') + b'i'
+    if _is_float(value):
+        return repr(float(value)).encode('ascii')
+    return _text(str(value)).encode('utf-8')
+
+
+def _encode_int(value):
+    return str(value).encode('ascii') + b'i'
+
+
+def _encode_float(value):
+    return repr(value).encode('ascii')
+
+
+def _encode_text(value):
+    return _quote_string(value).encode('utf-8')
+
+
+# exact-type fast paths for the common field value types
+_VALUE_ENCODERS = {
+    float: _encode_float,
+    bool: lambda value: b'True' if value else b'False',
+    text_type: _encode_text,
+    bytes: lambda value: _encode_text(value.decode('utf-8')),
+}
+for _type in integer_types:
+    _VALUE_ENCODERS[_type] = _encode_int
+
+
+def _convert_timestamp(timestamp, precision=None):
+    if isinstance(timestamp, Integral):
+        return timestamp
+
+    if isinstance(timestamp, bytes):
+        timestamp = timestamp.decode('utf-8')
+    if isinstance(timestamp, text_type):
+        timestamp = parse(timestamp)
+
+    if isinstance(timestamp, datetime):
+        if not timestamp.tzinfo:
+            timestamp = UTC.localize(timestamp)
+
+        delta = timestamp - EPOCH
+        ns = (delta.days * 86400 * 10 ** 9 +
+              delta.seconds * 10 ** 9 +
+              delta.microseconds * 10 ** 3)
+        if precision is None or precision == 'n':
+            return ns
+        if precision == 'u':
+            return ns / 10 ** 3
+        if precision == 'ms':
+            return ns / 10 ** 6
+        if precision == 's':
+            return ns / 10 ** 9
+        if precision == 'm':
+            return ns / 10 ** 9 / 60
+        if precision == 'h':
+            return ns / 10 ** 9 / 3600
+
+    raise ValueError(timestamp)
+
+
+class LineProtocolEncoder(object):
+    """Encode points into line protocol bytes.
+
+    :param cache_size: maximum number of entries per memo table; a table is
+        cleared when it grows past this size, defaults to 100000
+    :type cache_size: int
+    """
+
+    def __init__(self, cache_size=100000):
+        self._cache_size = cache_size
+        self._keys = {}
+        self._prefixes = {}
+        self._field_orders = {}
+
+    def clear(self):
+        """Drop all memoized strings."""
+        self._keys.clear()
+        self._prefixes.clear()
+        self._field_orders.clear()
+
+    def _key(self, key):
+        if type(key) not in _STRING_TYPES:
+            return _escape_tag(key).encode('utf-8')
+        try:
+            return self._keys[key]
+        except KeyError:
+            pass
+        if len(self._keys) >= self._cache_size:
+            self._keys.clear()
+        escaped = self._keys[key] = _escape_tag(key).encode('utf-8')
+        return escaped
+
+    def _series_prefix(self, measurement, tags):
+        items = tuple(tags.items())
+        cache_key = None
+        if type(measurement) in _STRING_TYPES and \
+                all(type(key) in _STRING_TYPES and type(value) in _STRING_TYPES
+                    for key, value in items):
+            cache_key = (measurement, items)
+            try:
+                return self._prefixes[cache_key]
+            except KeyError:
+                pass
+
+        parts = [self._key(measurement)]
+        for tag_key in sorted(tags.keys()):
+            key = self._key(tag_key)
+            value = self._key(tags[tag_key])
+            if key and value:
+                parts.append(key + b'=' + value)
+        prefix = b','.join(parts)
+
+        if cache_key is not None:
+            if len(self._prefixes) >= self._cache_size:
+                self._prefixes.clear()
+            self._prefixes[cache_key] = prefix
+        return prefix
+
+    def _field_order(self, fields):
+        cache_key = tuple(fields)
+        if all(type(key) in _STRING_TYPES for key in cache_key):
+            try:
+                return self._field_orders[cache_key]
+            except KeyError:
+                pass
+        else:
+            cache_key = None
+
+        order = [(field_key, self._key(field_key))
+                 for field_key in sorted(fields.keys())]
+        if cache_key is not None:
+            if len(self._field_orders) >= self._cache_size:
+                self._field_orders.clear()
+            self._field_orders[cache_key] = order
+        return order
+
+    def make_line(self, measurement, tags=None, fields=None, time=None,
+                  precision=None):
+        """Encode a single point.
+
+        :returns: the encoded line, without a trailing newline
+        :rtype: bytes
+        """
+        line = self._series_prefix(measurement, tags or {})
+
+        if fields:
+            field_list = []
+            for field_key, key in self._field_order(fields):
+                value = fields[field_key]
+                encode = _VALUE_ENCODERS.get(type(value))
+                if encode is not None:
+                    value = encode(value)
+                else:
+                    value = _encode_value(value)
+                if key and value:
+                    field_list.append(key + b'=' + value)
+            if field_list:
+                line += b' ' + b','.join(field_list)
+
+        if time is not None:
+            if type(time) not in integer_types:
+                time = int(_convert_timestamp(time, precision))
+            line += b' ' + str(time).encode('ascii')
+
+        return line
+
+    def encode_points(self, data, precision=None):
+        """Encode the points of a JSON-protocol write body.
+
+        :param data: a dict with a ``points`` list and optional ``tags`` and
+            ``measurement`` defaults, as accepted by :meth:`make_lines`
+        :type data: dict
+        :returns: one encoded line per point
+        :rtype: list of bytes
+        """
+        lines = []
+        static_tags = data.get('tags')
+        default_measurement = data.get('measurement')
+        make_line = self.make_line
+        for point in data['points']:
+            if static_tags:
+                tags = dict(static_tags)
+                tags.update(point.get('tags') or {})
+            else:
+                tags = point.get('tags') or {}
+
+            lines.append(make_line(
+                point.get('measurement', default_measurement),
+                tags=tags,
+                fields=point.get('fields'),
+                time=point.get('time'),
+                precision=precision))
+        return lines
+
+    def make_lines(self, data, precision=None):
+        """Encode a JSON-protocol write body into line protocol.
+
+        :param data: a dict with a ``points`` list and optional ``tags`` and
+            ``measurement`` defaults
+        :type data: dict
+        :param precision: the time precision of datetime timestamps
+        :type precision: str
+        :returns: the newline terminated line protocol body
+        :rtype: bytes
+        """
+        return b'\n'.join(self.encode_points(data, precision)) + b'\n'
+
+
+_default_encoder = LineProtocolEncoder()
+
+encode_points = _default_encoder.encode_points
+make_lines = _default_encoder.make_lines
+
+
+_NANOS_PER_UNIT = {
+    None: 1,
+    'n': 1,
+    'u': 10 ** 3,
+    'ms': 10 ** 6,
+    's': 10 ** 9,
+    'm': 60 * 10 ** 9,
+    'h': 3600 * 10 ** 9,
+}
+
+
+def _escape_tag_column(values):
+    if values.dtype.kind == 'S':
+        values = np.char.decode(values, 'utf-8')
+    else:
+        values = values.astype(text_type)
+    if (values == u'').any():
+        raise ValueError("tag values must not be empty")
+    for char, escaped in ((u"\\", u"\\\\"), (u" ", u"\\ "), (u",", u"\\,"),
+                          (u"=", u"\\="), (u"\n", u"\\n")):
+        values = np.char.replace(values, char, escaped)
+    return values.astype(object)
+
+
+def _format_field_column(key, values):
+    kind = values.dtype.kind
+    if kind == 'b':
+        return np.where(values, u'True', u'False').astype(object)
+    if kind in 'iu':
+        return values.astype(text_type).astype(object) + u'i'
+    if kind == 'f':
+        if np.isnan(values).any():
+            raise ValueError("float fields must not contain NaN")
+        return values.astype(text_type).astype(object)
+    if kind == 'S':
+        values = np.char.decode(values, 'utf-8')
+    elif kind == 'O':
+        # e.g. integers with a None: writing them as strings would create
+        # a string field or a type conflict on the server
+        if not all(isinstance(value, (bytes, text_type)) for value in values):
+            raise ValueError(
+                "field %r: object columns must only hold strings; numeric "
+                "columns must not contain None" % key)
+        values = np.array([value.decode('utf-8')
+                           if isinstance(value, bytes) else value
+                           for value in values], dtype=text_type)
+    elif kind != 'U':
+        raise ValueError("field %r: unsupported column dtype %s" % (
+            key, values.dtype))
+    for char, escaped in ((u"\\", u"\\\\"), (u"\"", u"\\\""), (u"\n", u"\\n")):
+        values = np.char.replace(values, char, escaped)
+    return u'"' + values.astype(object) + u'"'
+
+
+def _format_time_column(values, precision):
+    if values.dtype.kind == 'M':
+        nanos = values.astype('datetime64[ns]').astype(np.int64)
+        values = nanos // _NANOS_PER_UNIT[precision]
+    return values.astype(np.int64).astype(text_type).astype(object)
+
+
+def make_lines_columns(measurement, time=None, tags=None, fields=None,
+                       precision=None):
+    """Encode columnar data of one measurement into line protocol.
+
+    Each column is formatted as a whole with NumPy; no per-point dicts are
+    built.
+
+    :param measurement: the measurement of every row
+    :type measurement: str
+    :param time: timestamps, either integers already in ``precision`` or
+        ``datetime64`` values, defaults to None (server-side timestamps)
+    :type time: array-like
+    :param tags: tag values by key, each either a single value shared by all
+        rows or an array-like with one value per row
+    :type tags: dict
+    :param fields: field values by key, each an array-like with one value
+        per row
+    :type fields: dict
+    :param precision: the time precision of the written timestamps
+    :type precision: str
+    :returns: the newline terminated line protocol body
+    :rtype: bytes
+    """
+    if np is None:
+        raise ImportError("make_lines_columns requires numpy")
+    if not fields:
+        raise ValueError("at least one field column is required")
+    if precision not in _NANOS_PER_UNIT:
+        raise ValueError(
+            "Invalid time precision is given. "
+            "(use 'n', 'u', 'ms', 's', 'm' or 'h')")
+
+    field_columns = [(_escape_tag(key), np.asarray(values))
+                     for key, values in sorted(fields.items())]
+    rows = len(field_columns[0][1])
+
+    # tags in sorted key order, as alternating runs of static text and
+    # per-row columns
+    parts = [_escape_tag(measurement)]
+    tag_columns = []
+    for key in sorted((tags or {}).keys()):
+        values = tags[key]
+        if isinstance(values, (bytes, text_type)) or np.ndim(values) == 0:
+            value = _escape_tag(values)
+            if value:
+                parts[-1] += u',%s=%s' % (_escape_tag(key), value)
+        else:
+            values = np.asarray(values)
+            tag_columns.append(values)
+            parts[-1] += u',%s=' % _escape_tag(key)
+            parts.extend([values, u''])
+
+    columns = [values for _, values in field_columns] + tag_columns
+    if time is not None:
+        time = np.asarray(time)
+        columns.append(time)
+    if any(len(values) != rows for values in columns):
+        raise ValueError("all columns must have the same length")
+    if not rows:
+        return b''
+
+    lines = np.full(rows, parts[0], dtype=object)
+    for i in range(1, len(parts), 2):
+        lines = lines + _escape_tag_column(parts[i]) + parts[i + 1]
+
+    separator = u' '
+    for key, values in field_columns:
+        lines = lines + (separator + key + u'=') + \
+            _format_field_column(key, values)
+        separator = u','
+
+    if time is not None:
+        lines = lines + u' ' + _format_time_column(time, precision)
+
+    return (u'\n'.join(lines.tolist()) + u'\n').encode('utf-8')
@@ -0,0 +1,237 @@
+# coding:utf-8
+
+import bisect
+import logging
+import time
+from collections import deque
+
+
+slow_query_logger = logging.getLogger('influxtor.slow_query')
+
+# upper bounds of the histogram buckets in seconds: 100us doubling up to
+# about 105s; slower observations go to an overflow bucket
+_BUCKETS = tuple(0.0001 * 2 ** i for i in range(21))
+
+
+class Histogram(object):
+    """Distribution of durations in exponentially growing buckets."""
+
+    def __init__(self, buckets=_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q):
+        """Estimate a quantile as the upper bound of its bucket."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                if i < len(self.buckets):
+                    return min(self.buckets[i], self.max)
+                return self.max
+        return self.max
+
+    def snapshot(self):
+        """Return the histogram as a dict.
+
+        :returns: the count, sum, mean, max and estimated p50, p90 and p99
+            in seconds, and the cumulative count per bucket upper bound
+        :rtype: dict
+        """
+        cumulative = []
+        seen = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            seen += count
+            cumulative.append((bound, seen))
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'mean': self.sum / self.count if self.count else None,
+            'max': self.max,
+            'p50': self.quantile(0.5),
+            'p90': self.quantile(0.9),
+            'p99': self.quantile(0.99),
+            'buckets': cumulative,
+        }
+
+
+class _Rate(object):
+    """Per-second rate over a sliding window of one-second slots."""
+
+    def __init__(self, window=60):
+        self._window = window
+        self._slots = deque()
+
+    def add(self, amount, now):
+        second = int(now)
+        if self._slots and self._slots[-1][0] == second:
+            self._slots[-1][1] += amount
+        else:
+            self._slots.append([second, amount])
+            self._expire(second)
+
+    def _expire(self, second):
+        while self._slots and self._slots[0][0] <= second - self._window:
+            self._slots.popleft()
+
+    def per_second(self, now):
+        self._expire(int(now))
+        return sum(amount for _, amount in self._slots) / float(self._window)
+
+
+class ClientMetrics(object):
+    """Timings, counters and hooks of an :class:`~.InfluxDBClient`.
+
+    Every client records its metrics in one of these, available as
+    ``client.metrics``; :meth:`InfluxDBClient.stats` adds the requests in
+    flight.
+
+    Timings are kept as histograms in seconds:
+
+    - 'write': a whole :meth:`~.InfluxDBClient.write` call
+    - 'encode': encoding the points into line protocol
+    - 'query': a whole :meth:`~.InfluxDBClient.query` call
+    - 'decode': decoding a query response
+    - 'result_set': building the ResultSets of a query
+    - 'http': an HTTP request, from sending to the response
+    - 'network': the part of an HTTP request spent on the connection, as
+      reported by the HTTP client
+    - 'queue': the part of an HTTP request spent waiting for a free
+      connection of the pool
+
+    :param slow_query_threshold: queries taking longer than this many
+        seconds are logged as warnings to the 'influxtor.slow_query' logger,
+        defaults to None (disabled)
+    :type slow_query_threshold: float
+    :param before_request: called with each ``HTTPRequest`` before it is
+        sent
+    :type before_request: callable
+    :param after_response: called after each HTTP request with the
+        ``HTTPRequest``, the ``HTTPResponse`` (None if it failed), the error
+        (None if it succeeded) and the elapsed seconds
+    :type after_response: callable
+    :param rate_window: seconds over which the per second rates are
+        averaged, defaults to 60
+    :type rate_window: int
+
+    :Example:
+
+    ::
+
+        >> def export(request, response, error, elapsed):
+        ..     statsd.timing('influxdb.request', elapsed * 1000)
+        >> metrics = ClientMetrics(slow_query_threshold=1.0,
+        ..                         after_response=export)
+        >> client = InfluxDBClient(database='metrics', metrics=metrics)
+        >> client.stats()['timings']['query']['p99']
+        0.0128
+    """
+
+    TIMINGS = ('write', 'encode', 'query', 'decode', 'result_set',
+               'http', 'network', 'queue')
+
+    def __init__(self,
+                 slow_query_threshold=None,
+                 before_request=None,
+                 after_response=None,
+                 rate_window=60):
+        self.slow_query_threshold = slow_query_threshold
+        self.before_request = before_request
+        self.after_response = after_response
+
+        self.timings = dict((name, Histogram()) for name in self.TIMINGS)
+        self.writes = 0
+        self.queries = 0
+        self.slow_queries = 0
+        self.errors = 0
+        self.points_written = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self._points_rate = _Rate(rate_window)
+        self._bytes_sent_rate = _Rate(rate_window)
+        self._bytes_received_rate = _Rate(rate_window)
+
+    def _now(self):
+        return time.time()
+
+    def observe(self, name, seconds):
+        """Record a duration in the histogram called name."""
+        self.timings[name].observe(seconds)
+
+    def record_write(self, points, seconds):
+        self.writes += 1
+        self.points_written += points
+        self._points_rate.add(points, self._now())
+        self.observe('write', seconds)
+
+    def record_query(self, query, database, seconds):
+        self.queries += 1
+        self.observe('query', seconds)
+        if self.slow_query_threshold is not None and \
+                seconds >= self.slow_query_threshold:
+            self.slow_queries += 1
+            slow_query_logger.warning("Slow query (%.3fs) on %s: %s",
+                                      seconds, database, query)
+
+    def _before_request(self, request):
+        body = request.body
+        if body:
+            self.bytes_sent += len(body)
+            self._bytes_sent_rate.add(len(body), self._now())
+        if self.before_request is not None:
+            self.before_request(request)
+
+    def _after_response(self, request, response, error, seconds):
+        self.observe('http', seconds)
+        if response is None:
+            response = getattr(error, 'response', None)
+        if error is not None:
+            self.errors += 1
+        if response is not None:
+            if response.body:
+                self.bytes_received += len(response.body)
+                self._bytes_received_rate.add(len(response.body),
+                                              self._now())
+            if response.request_time is not None:
+                self.observe('network', response.request_time)
+                self.observe('queue',
+                             max(0.0, seconds - response.request_time))
+        if self.after_response is not None:
+            self.after_response(request,
+                                None if error is not None else response,
+                                error, seconds)
+
+    def stats(self):
+        """Return the counters, rates and timing histograms.
+
+        :rtype: dict
+        """
+        now = self._now()
+        return {
+            'writes': self.writes,
+            'queries': self.queries,
+            'slow_queries': self.slow_queries,
+            'errors': self.errors,
+            'points_written': self.points_written,
+            'bytes_sent': self.bytes_sent,
+            'bytes_received': self.bytes_received,
+            'points_per_second': self._points_rate.per_second(now),
+            'bytes_sent_per_second': self._bytes_sent_rate.per_second(now),
+            'bytes_received_per_second':
+                self._bytes_received_rate.per_second(now),
+            'timings': dict((name, histogram.snapshot())
+                            for name, histogram in self.timings.items()),
+        }
@@ -0,0 +1,82 @@
+# coding:utf-8
+
+import re
+from urllib.parse import quote_plus, urlencode
+
+from .codec import get_codec
+
+
+# $name bind parameters; InfluxDB also accepts $"quoted name"
+_BIND_PARAM = re.compile(r'\$(?:"((?:[^"\\]|\\.)*)"|(\w+))')
+
+
+class PreparedQuery(object):
+    """A query template with ``$name`` bind parameters.
+
+    Created by :meth:`InfluxDBClient.prepare`. The query text, database,
+    epoch and extra parameters are urlencoded once; an execution only
+    encodes its bound values, which InfluxDB receives apart from the query
+    as its ``params`` JSON, so they are never parsed as InfluxQL.
+
+    :Example:
+
+    ::
+
+        >> stmt = client.prepare(
+        ..     'SELECT value FROM cpu WHERE host = $host AND time > now() - $d')
+        >> result = await stmt.execute({'host': 'server01', 'd': '1h'})
+    """
+
+    def __init__(self, client, query, database=None, epoch=None,
+                 params=None):
+        self.query = query
+        self.database = database
+        self.epoch = epoch
+        self.bind_names = frozenset(quoted or name for quoted, name
+                                    in _BIND_PARAM.findall(query))
+        self._client = client
+
+        static = [('q', query), ('db', database)]
+        if epoch is not None:
+            static.append(('epoch', epoch))
+        self._params = dict(params or {})
+        static.extend(sorted(self._params.items()))
+        self._encoded = urlencode(static)
+
+    async def execute(self, bind_params=None, raise_errors=True,
+                      cache_ttl=None, codec=None):
+        """Run the query with values bound to its parameters.
+
+        Takes the query cache, coalescing and codec settings of the client
+        like :meth:`InfluxDBClient.query`.
+
+        :param bind_params: a value for each ``$name`` in the query
+        :type bind_params: dict
+        :param raise_errors: Whether or not to raise exceptions when InfluxDB
+            returns errors, defaults to True
+        :type raise_errors: bool
+        :param cache_ttl: time to live of the cached response in seconds,
+            defaults to the query cache's ttl; 0 bypasses the cache
+        :type cache_ttl: float
+        :param codec: how the response is requested and decoded, 'json',
+            'csv' or a codec instance, defaults to the client's codec
+        :type codec: str or :class:`~.JSONCodec`
+        :returns: the queried data
+        :rtype: :class:`~.ResultSet`
+        """
+        bind_params = bind_params or {}
+        missing = self.bind_names.difference(bind_params)
+        if missing:
+            raise ValueError("Missing bind parameters: %s" %
+                             ", ".join(sorted(missing)))
+
+        client = self._client
+        params = dict(self._params)
+        encoded = self._encoded
+        if bind_params:
+            params['params'] = client._codec.dumps(bind_params)
+            encoded += '&params=' + quote_plus(params['params'])
+        return await client._query(
+            self.query, params, self.epoch, 200, self.database,
+            raise_errors, cache_ttl, get_codec(codec) or client._codec,
+            encoded)
@@ -0,0 +1,310 @@
+# coding:utf-8
+
+import logging
+import time
+from collections import deque
+
+from tornado.concurrent import (Future, future_set_exception_unless_cancelled,
+                                future_set_result_unless_cancelled)
+from tornado.gen import sleep
+from tornado.ioloop import IOLoop
+from tornado.locks import Condition, Semaphore
+
+
+logger = logging.getLogger(__name__)
+
+_OVERFLOW_POLICIES = ('block', 'drop_oldest', 'drop_newest', 'spill')
+
+
+class TokenBucket(object):
+    """Token bucket refilled at ``rate`` tokens per second.
+
+    Taking more tokens than are available puts the bucket into debt
+    instead of failing, so a batch larger than the bucket still goes
+    through; the caller waits until the debt is paid off.
+
+    :param rate: tokens added per second
+    :type rate: float
+    :param capacity: maximum number of tokens, defaults to ``rate`` (one
+        second worth of burst)
+    :type capacity: float
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self._tokens = self.capacity
+        self._last = self._now()
+
+    def _now(self):
+        return time.time()
+
+    def take(self, amount):
+        """Take ``amount`` tokens.
+
+        :returns: the number of seconds to wait before using them
+        :rtype: float
+        """
+        now = self._now()
+        self._tokens = min(self.capacity,
+                           self._tokens + (now - self._last) * self.rate)
+        self._last = now
+        self._tokens -= amount
+        if self._tokens >= 0:
+            return 0.0
+        return -self._tokens / self.rate
+
+
+class _PendingWrite(object):
+
+    __slots__ = ('data', 'params', 'points', 'expected_response_code',
+                 'future')
+
+    def __init__(self, data, params, points, expected_response_code):
+        self.data = data
+        self.params = params
+        self.points = points
+        self.expected_response_code = expected_response_code
+        self.future = Future()
+
+
+class WriteLimiter(object):
+    """Rate limit and queue the writes of an :class:`~.InfluxDBClient`.
+
+    Encoded writes wait in a bounded queue and are sent no faster than
+    ``points_per_second`` and ``bytes_per_second`` allow. When the queue is
+    full, ``overflow`` decides what happens to a new write:
+
+    - 'block': the caller waits until there is room again
+    - 'drop_oldest': the oldest queued write is dropped to make room
+    - 'drop_newest': the new write is dropped
+    - 'spill': the new write goes to the client's :class:`~.WriteSpool`
+
+    A dropped write makes its :meth:`InfluxDBClient.write` call return
+    False.
+
+    A limiter belongs to a single client: its queued writes are sent by
+    the client it is attached to. Give every client, such as every node of
+    a :class:`~.ClusterClient`, its own limiter.
+
+    :param points_per_second: maximum write rate in points, defaults to
+        None (unlimited)
+    :type points_per_second: float
+    :param bytes_per_second: maximum write rate in bytes of line protocol,
+        defaults to None (unlimited)
+    :type bytes_per_second: float
+    :param burst: seconds worth of points and bytes that may be sent at once
+        after an idle period, defaults to 1
+    :type burst: float
+    :param max_queue: maximum number of queued write requests, defaults to
+        1000
+    :type max_queue: int
+    :param max_queue_bytes: maximum size of the queued writes in bytes,
+        defaults to None (no byte limit)
+    :type max_queue_bytes: int
+    :param overflow: what to do with a write when the queue is full,
+        'block', 'drop_oldest', 'drop_newest' or 'spill', defaults to
+        'block'
+    :type overflow: str
+    :param max_in_flight: maximum number of write requests sent and not
+        answered yet, defaults to None (no limit)
+    :type max_in_flight: int
+
+    :Example:
+
+    ::
+
+        >> limiter = WriteLimiter(points_per_second=50000, max_queue=100,
+        ..                        overflow='drop_oldest')
+        >> client = InfluxDBClient(database='metrics', write_limiter=limiter)
+        >> if limiter.queue_depth > 80:
+        ..     raise tornado.web.HTTPError(503)
+    """
+
+    def __init__(self,
+                 points_per_second=None,
+                 bytes_per_second=None,
+                 burst=1.0,
+                 max_queue=1000,
+                 max_queue_bytes=None,
+                 overflow='block',
+                 max_in_flight=None):
+        if overflow not in _OVERFLOW_POLICIES:
+            raise ValueError(
+                "Invalid overflow policy is given. "
+                "(use 'block', 'drop_oldest', 'drop_newest' or 'spill')")
+        if max_queue < 1:
+            raise ValueError("max_queue must be at least 1")
+
+        self.max_queue = max_queue
+        self.max_queue_bytes = max_queue_bytes
+        self.overflow = overflow
+
+        self._points_bucket = None
+        if points_per_second:
+            self._points_bucket = TokenBucket(points_per_second,
+                                              points_per_second * burst)
+        self._bytes_bucket = None
+        if bytes_per_second:
+            self._bytes_bucket = TokenBucket(bytes_per_second,
+                                             bytes_per_second * burst)
+        self._in_flight_slots = None
+        if max_in_flight:
+            self._in_flight_slots = Semaphore(max_in_flight)
+
+        self.sent = 0
+        self.blocked = 0
+        self.dropped = 0
+        self.dropped_points = 0
+        self.spilled = 0
+        self.throttled_seconds = 0.0
+
+        self._client = None
+        self._queue = deque()
+        self._queued_points = 0
+        self._queued_bytes = 0
+        self._in_flight = 0
+        self._draining = False
+        self._space = Condition()
+
+    @property
+    def queue_depth(self):
+        """Number of write requests waiting in the queue."""
+        return len(self._queue)
+
+    @property
+    def queued_points(self):
+        """Number of points waiting in the queue."""
+        return self._queued_points
+
+    @property
+    def queued_bytes(self):
+        """Size in bytes of the writes waiting in the queue."""
+        return self._queued_bytes
+
+    def stats(self):
+        """Return the queue state and counters.
+
+        :rtype: dict
+        """
+        return {
+            'queue_depth': len(self._queue),
+            'queued_points': self._queued_points,
+            'queued_bytes': self._queued_bytes,
+            'in_flight': self._in_flight,
+            'sent': self.sent,
+            'blocked': self.blocked,
+            'dropped': self.dropped,
+            'dropped_points': self.dropped_points,
+            'spilled': self.spilled,
+            'throttled_seconds': self.throttled_seconds,
+        }
+
+    def attach(self, client):
+        """Set the client sending the queued writes.
+
+        :raises ValueError: if the limiter is attached to another client
+        """
+        if self._client is not None and self._client is not client:
+            raise ValueError("The write limiter is already attached to "
+                             "another client")
+        if self.overflow == 'spill' and client._spool is None:
+            raise ValueError("overflow='spill' needs a client with a spool")
+        self._client = client
+
+    def _full(self, size):
+        if not self._queue:
+            return False
+        if len(self._queue) >= self.max_queue:
+            return True
+        return bool(self.max_queue_bytes and
+                    self._queued_bytes + size > self.max_queue_bytes)
+
+    def _dequeue(self):
+        entry = self._queue.popleft()
+        self._queued_points -= entry.points
+        self._queued_bytes -= len(entry.data)
+        self._space.notify_all()
+        return entry
+
+    def _drop(self, points):
+        self.dropped += 1
+        self.dropped_points += points
+        logger.debug("Write queue full, dropped %d points", points)
+
+    async def submit(self, data, params, points, expected_response_code):
+        """Queue an encoded write and wait until it was sent.
+
+        :param data: the line protocol body
+        :type data: bytes
+        :param params: the write's query parameters (db, rp, precision)
+        :type params: dict
+        :param points: number of points in the body
+        :type points: int
+        :param expected_response_code: the expected response code
+        :type expected_response_code: int
+        :returns: True if the write was sent or spilled, False if it was
+            dropped
+        :rtype: bool
+        """
+        size = len(data)
+        if self._full(size):
+            if self.overflow == 'block':
+                self.blocked += 1
+                while self._full(size):
+                    await self._space.wait()
+            elif self.overflow == 'drop_newest':
+                self._drop(points)
+                return False
+            elif self.overflow == 'drop_oldest':
+                while self._full(size):
+                    entry = self._dequeue()
+                    self._drop(entry.points)
+                    future_set_result_unless_cancelled(entry.future, False)
+            else:
+                self._client._spool.append(data, params)
+                self.spilled += 1
+                return True
+
+        entry = _PendingWrite(data, params, points, expected_response_code)
+        self._queue.append(entry)
+        self._queued_points += points
+        self._queued_bytes += size
+        if not self._draining:
+            self._draining = True
+            IOLoop.current().spawn_callback(self._drain)
+        return await entry.future
+
+    async def _drain(self):
+        try:
+            while self._queue:
+                entry = self._dequeue()
+                delay = 0.0
+                if self._points_bucket is not None:
+                    delay = self._points_bucket.take(entry.points)
+                if self._bytes_bucket is not None:
+                    delay = max(delay,
+                                self._bytes_bucket.take(len(entry.data)))
+                if delay > 0:
+                    self.throttled_seconds += delay
+                    await sleep(delay)
+                if self._in_flight_slots is not None:
+                    await self._in_flight_slots.acquire()
+                self._in_flight += 1
+                IOLoop.current().spawn_callback(self._send, entry)
+        finally:
+            self._draining = False
+
+    async def _send(self, entry):
+        try:
+            await self._client._send_write(entry.data, entry.params,
+                                           entry.expected_response_code)
+        except Exception as e:
+            future_set_exception_unless_cancelled(entry.future, e)
+        else:
+            self.sent += 1
+            future_set_result_unless_cancelled(entry.future, True)
+        finally:
+            self._in_flight -= 1
+            if self._in_flight_slots is not None:
+                self._in_flight_slots.release()
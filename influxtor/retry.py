@@ -0,0 +1,175 @@
+# coding:utf-8
+
+import logging
+import random
+import socket
+import time
+
+from tornado.httpclient import HTTPError
+
+from .exceptions import InfluxDBCircuitOpenError, InfluxDBServerError
+
+
+logger = logging.getLogger(__name__)
+
+
+def _status(error):
+    if isinstance(error, HTTPError):
+        return error.code
+    return None
+
+
+class RetryPolicy(object):
+    """When and how often :meth:`InfluxDBClient.request` retries.
+
+    Delays grow exponentially from ``backoff`` up to ``max_backoff`` and,
+    with ``jitter``, a random delay between zero and that value is used
+    ("full jitter"), so clients failing together do not retry together.
+    A ``Retry-After`` header on the response raises the delay to at least
+    the requested time.
+
+    :param max_attempts: total number of attempts, including the first one,
+        defaults to 3
+    :type max_attempts: int
+    :param backoff: delay before the first retry in seconds, defaults to 0.1
+    :type backoff: float
+    :param max_backoff: upper bound of a delay in seconds, defaults to 10
+    :type max_backoff: float
+    :param multiplier: growth factor of the delay, defaults to 2
+    :type multiplier: float
+    :param jitter: randomize the delays, defaults to True
+    :type jitter: bool
+    :param retry_on_status: HTTP status codes that are retried, defaults to
+        429 and 5xx gateway and availability errors; 4xx schema and syntax
+        errors are never worth retrying
+    :type retry_on_status: iterable of int
+    :param retry_on_timeout: retry timeouts and connection errors, defaults
+        to True
+    :type retry_on_timeout: bool
+    """
+
+    def __init__(self,
+                 max_attempts=3,
+                 backoff=0.1,
+                 max_backoff=10.0,
+                 multiplier=2.0,
+                 jitter=True,
+                 retry_on_status=(429, 500, 502, 503, 504),
+                 retry_on_timeout=True):
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.retry_on_status = frozenset(retry_on_status)
+        self.retry_on_timeout = retry_on_timeout
+
+    def should_retry(self, error, attempt):
+        """Whether the request that failed with error on its attempt-th
+        try (starting at 1) should be sent again."""
+        if attempt >= self.max_attempts:
+            return False
+        if isinstance(error, InfluxDBCircuitOpenError):
+            return False
+        status = _status(error)
+        if status == 599 or (status is None and
+                             isinstance(error, (socket.error, IOError,
+                                                OSError))):
+            return self.retry_on_timeout
+        if status is not None:
+            return status in self.retry_on_status
+        return isinstance(error, InfluxDBServerError)
+
+    def delay(self, error, attempt):
+        """Seconds to wait before the retry following the attempt-th try."""
+        delay = min(self.max_backoff,
+                    self.backoff * self.multiplier ** (attempt - 1))
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        response = getattr(error, 'response', None)
+        if response is not None:
+            retry_after = response.headers.get('Retry-After')
+            if retry_after and retry_after.isdigit():
+                delay = max(delay, min(self.max_backoff, int(retry_after)))
+        return delay
+
+
+class CircuitBreaker(object):
+    """Fail fast while InfluxDB is down.
+
+    After ``failure_threshold`` consecutive server errors, timeouts or
+    connection errors the circuit opens and requests fail immediately with
+    :class:`InfluxDBCircuitOpenError`. After ``reset_timeout`` seconds a
+    single trial request is let through: its success closes the circuit,
+    its failure opens it again.
+
+    :param failure_threshold: consecutive failures that open the circuit,
+        defaults to 5
+    :type failure_threshold: int
+    :param reset_timeout: seconds the circuit stays open before a trial
+        request, defaults to 30
+    :type reset_timeout: float
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def _now(self):
+        return time.time()
+
+    def allow(self):
+        """Whether a request may be sent now."""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            if self._now() - self.opened_at < self.reset_timeout:
+                return False
+            self.state = self.HALF_OPEN
+            self._trial_in_flight = False
+        if self._trial_in_flight:
+            return False
+        self._trial_in_flight = True
+        return True
+
+    def record_success(self):
+        """Record a request answered by the server."""
+        if self.state != self.CLOSED:
+            logger.info("Circuit closed, InfluxDB is answering again")
+        self.state = self.CLOSED
+        self.failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        """Record a server error, timeout or connection error."""
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.state == self.HALF_OPEN or \
+                self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning("Circuit opened after %d failures",
+                               self.failures)
+            self.state = self.OPEN
+            self.opened_at = self._now()
+
+    def record_abandoned(self):
+        """Record a request given up without an answer, e.g. cancelled;
+        a trial request may then be sent again."""
+        self._trial_in_flight = False
+
+    @staticmethod
+    def is_failure(error):
+        """Whether an error counts towards opening the circuit."""
+        status = _status(error)
+        if status is not None:
+            return status >= 500 or status == 429
+        return isinstance(error, (InfluxDBServerError, socket.error,
+                                  IOError, OSError))
@@ -0,0 +1,336 @@
+# coding:utf-8
+
+import time
+
+from influxdb.line_protocol import quote_ident
+from tornado.gen import convert_yielded, multi
+
+from .exceptions import InfluxDBFieldTypeError
+
+
+_BOOLEANS = {'t': True, 'true': True, 'f': False, 'false': False}
+
+
+def _field_type(value):
+    if isinstance(value, bool):
+        return 'boolean'
+    if isinstance(value, int):
+        return 'integer'
+    if isinstance(value, float):
+        return 'float'
+    if isinstance(value, (str, bytes)):
+        return 'string'
+    return None
+
+
+def _coerce(value, expected):
+    if expected == 'string':
+        if isinstance(value, bytes):
+            return value.decode('utf-8')
+        return str(value)
+    if expected == 'boolean':
+        return _BOOLEANS[value.lower()]
+    if isinstance(value, bool):
+        raise ValueError("booleans are not numbers")
+    if expected == 'float':
+        return float(value)
+    if isinstance(value, float) and not value.is_integer():
+        raise ValueError("%r is not an integer" % value)
+    return int(value)
+
+
+class SchemaRegistry(object):
+    """Cache of the measurements, tag keys, tag values and field types of
+    the databases a client uses.
+
+    Each list is loaded with a ``SHOW`` query the first time it is asked
+    for and kept for ``ttl`` seconds; concurrent lookups share one query.
+    Measurements the client writes to are added to the cached list of
+    their database.
+
+    With ``check_fields``, the client checks the fields of every
+    JSON-protocol write against the field types before sending it, so a
+    value of the wrong type fails on the client instead of being rejected
+    by the server as a partial write. 'validate' raises
+    :class:`~.InfluxDBFieldTypeError`; 'coerce' converts the value to the
+    field's type when that is lossless (an integer to a float field, a
+    whole float or a numeric string to an integer field, anything to a
+    string field, 'true' or 'false' to a boolean field) and raises
+    otherwise. A field not known yet takes the type of its first value in
+    a write, and that type is cached once the write succeeded. If the field
+    types cannot be loaded because the server is failing, the write is
+    sent unchecked (and spooled, if the client has a spool).
+
+    :param ttl: seconds a loaded list stays cached, defaults to 300
+    :type ttl: float
+    :param check_fields: check the fields of writes, None, 'validate' or
+        'coerce', defaults to None
+    :type check_fields: str
+    :param learn_from_writes: add the measurements written by the client to
+        the cached lists, defaults to True
+    :type learn_from_writes: bool
+    :param max_entries: number of cached lists above which expired and
+        then the oldest lists are dropped, defaults to 10000
+    :type max_entries: int
+
+    :Example:
+
+    ::
+
+        >> schema = SchemaRegistry(ttl=60, check_fields='coerce')
+        >> client = InfluxDBClient(database='metrics', schema=schema)
+        >> await schema.field_types('cpu')
+        {'value': 'float', 'state': 'string'}
+        >> await client.write_points(
+        ..     [{'measurement': 'cpu', 'fields': {'value': 1}}])  # sent as 1.0
+    """
+
+    def __init__(self,
+                 ttl=300,
+                 check_fields=None,
+                 learn_from_writes=True,
+                 max_entries=10000):
+        if check_fields not in (None, 'validate', 'coerce'):
+            raise ValueError("Invalid check_fields is given. "
+                             "(use None, 'validate' or 'coerce')")
+        self.ttl = ttl
+        self.check_fields = check_fields
+        self.learn_from_writes = learn_from_writes
+        self.max_entries = max_entries
+
+        self.hits = 0
+        self.misses = 0
+        self.coerced = 0
+
+        self._client = None
+        self._entries = {}
+        self._loading = {}
+
+    def _now(self):
+        return time.time()
+
+    def attach(self, client):
+        """Set the client used to load the schema."""
+        self._client = client
+
+    def stats(self):
+        """Return the cache counters.
+
+        :rtype: dict
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'coerced': self.coerced,
+            'entries': len(self._entries),
+        }
+
+    def invalidate(self, database=None, measurement=None):
+        """Drop cached lists, so they are loaded again when next used.
+
+        :param database: only drop the lists of this database, defaults to
+            None (all databases)
+        :type database: str
+        :param measurement: only drop the lists of this measurement and the
+            database's list of measurements, defaults to None (all lists)
+        :type measurement: str
+        """
+        for key in list(self._entries):
+            if database is not None and key[0] != database:
+                continue
+            if measurement is not None and len(key) > 2 and \
+                    key[2] != measurement:
+                continue
+            del self._entries[key]
+
+    def _database(self, database):
+        return database or self._client._database
+
+    async def _get(self, key, query, parse):
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > self._now():
+            self.hits += 1
+            return entry[1]
+        loading = self._loading.get(key)
+        if loading is None:
+            self.misses += 1
+            loading = convert_yielded(self._load(key, query, parse))
+            self._loading[key] = loading
+        return await loading
+
+    async def _load(self, key, query, parse):
+        try:
+            result = await self._client.query(query, database=key[0],
+                                              cache_ttl=0)
+        finally:
+            del self._loading[key]
+        value = parse(result.get_points())
+        if len(self._entries) >= self.max_entries:
+            now = self._now()
+            for old_key in [old_key for old_key, entry
+                            in self._entries.items() if entry[0] <= now]:
+                del self._entries[old_key]
+            while len(self._entries) >= self.max_entries:
+                del self._entries[next(iter(self._entries))]
+        self._entries[key] = (self._now() + self.ttl, value)
+        return value
+
+    def _measurements(self, database):
+        return self._get(
+            (database, 'measurements'),
+            "SHOW MEASUREMENTS ON %s" % quote_ident(database),
+            lambda points: sorted(point['name'] for point in points))
+
+    def _field_types(self, database, measurement):
+        return self._get(
+            (database, 'field_types', measurement),
+            "SHOW FIELD KEYS ON %s FROM %s" % (quote_ident(database),
+                                               quote_ident(measurement)),
+            lambda points: dict((point['fieldKey'], point['fieldType'])
+                                for point in points))
+
+    async def measurements(self, database=None):
+        """Get the measurements of a database.
+
+        :param database: the database, defaults to the client's database
+        :type database: str
+        :rtype: list of str
+        """
+        return list(await self._measurements(self._database(database)))
+
+    async def tag_keys(self, measurement, database=None):
+        """Get the tag keys of a measurement.
+
+        :param measurement: the measurement
+        :type measurement: str
+        :param database: the database, defaults to the client's database
+        :type database: str
+        :rtype: list of str
+        """
+        database = self._database(database)
+        keys = await self._get(
+            (database, 'tag_keys', measurement),
+            "SHOW TAG KEYS ON %s FROM %s" % (quote_ident(database),
+                                             quote_ident(measurement)),
+            lambda points: [point['tagKey'] for point in points])
+        return list(keys)
+
+    async def tag_values(self, measurement, key, database=None):
+        """Get the values of a tag of a measurement.
+
+        :param measurement: the measurement
+        :type measurement: str
+        :param key: the tag key
+        :type key: str
+        :param database: the database, defaults to the client's database
+        :type database: str
+        :rtype: list of str
+        """
+        database = self._database(database)
+        values = await self._get(
+            (database, 'tag_values', measurement, key),
+            "SHOW TAG VALUES ON %s FROM %s WITH KEY = %s" % (
+                quote_ident(database), quote_ident(measurement),
+                quote_ident(key)),
+            lambda points: [point['value'] for point in points])
+        return list(values)
+
+    async def field_types(self, measurement, database=None):
+        """Get the field types of a measurement.
+
+        :param measurement: the measurement
+        :type measurement: str
+        :param database: the database, defaults to the client's database
+        :type database: str
+        :returns: the type ('float', 'integer', 'string' or 'boolean') of
+            each field
+        :rtype: dict
+        """
+        database = self._database(database)
+        return dict(await self._field_types(database, measurement))
+
+    async def check_points(self, points, database=None, coerce=None,
+                           measurement=None):
+        """Check the field values of points against the field types.
+
+        :param points: JSON-protocol points
+        :type points: list of dicts
+        :param database: the database written to, defaults to the client's
+            database
+        :type database: str
+        :param coerce: convert values to the fields' types instead of
+            raising, defaults to True if ``check_fields`` is 'coerce'
+        :type coerce: bool
+        :param measurement: measurement of the points without one
+        :type measurement: str
+        :returns: the points, copied where values were converted
+        :rtype: list of dicts
+        :raises InfluxDBFieldTypeError: if a value does not match (or
+            cannot be converted to) the type of its field
+        """
+        points, _ = await self._check_points(points, database, coerce,
+                                             measurement)
+        return points
+
+    async def _check_points(self, points, database, coerce, measurement):
+        # also returns the types of the fields new to each measurement,
+        # which the client learns once the write succeeded
+        database = self._database(database)
+        if coerce is None:
+            coerce = self.check_fields == 'coerce'
+        names = list(set(point.get('measurement', measurement)
+                         for point in points))
+        known = dict(zip(names, await multi(
+            [self._field_types(database, name) for name in names])))
+        new_fields = dict((name, {}) for name in names)
+
+        checked = None
+        for index, point in enumerate(points):
+            name = point.get('measurement', measurement)
+            types = known[name]
+            new_types = new_fields[name]
+            fields = point['fields']
+            converted = None
+            for field, value in fields.items():
+                actual = _field_type(value)
+                if actual is None:
+                    continue
+                expected = types.get(field) or new_types.get(field)
+                if expected is None:
+                    # a new field takes the type of its first value
+                    new_types[field] = actual
+                    continue
+                if actual == expected:
+                    continue
+                if not coerce:
+                    raise InfluxDBFieldTypeError(name, field, expected, value)
+                try:
+                    value = _coerce(value, expected)
+                except (KeyError, TypeError, ValueError, AttributeError):
+                    raise InfluxDBFieldTypeError(name, field, expected, value)
+                if converted is None:
+                    converted = dict(fields)
+                converted[field] = value
+                self.coerced += 1
+            if converted is not None:
+                if checked is None:
+                    checked = list(points)
+                checked[index] = dict(point, fields=converted)
+        new_fields = dict((name, types)
+                          for name, types in new_fields.items() if types)
+        return (points if checked is None else checked), new_fields
+
+    def _learn(self, database, measurements, new_fields=None):
+        measurements = set(name for name in measurements if name)
+        key = (database, 'measurements')
+        entry = self._entries.get(key)
+        if entry is not None and not measurements.issubset(entry[1]):
+            self._entries[key] = (entry[0],
+                                  sorted(set(entry[1]) | measurements))
+        for name, types in (new_fields or {}).items():
+            key = (database, 'field_types', name)
+            entry = self._entries.get(key)
+            if entry is not None:
+                learned = dict(types)
+                learned.update(entry[1])
+                self._entries[key] = (entry[0], learned)
@@ -0,0 +1,289 @@
+# coding:utf-8
+
+import bisect
+import hashlib
+import re
+
+from tornado.gen import multi
+
+from .client import (InfluxDBClient, _LINE_SERIES_KEY, _LINE_UNESCAPE,
+                     _client_kwargs)
+from .exceptions import InfluxDBPartialWriteError
+
+
+# routed series kept per client, by series key
+_ROUTE_CACHE_SIZE = 100000
+
+_LINE_SERIES_PARTS = re.compile(r'(?:[^,\\]|\\.)+')
+_LINE_TAG = re.compile(r'((?:[^=\\]|\\.)*)=(.*)')
+
+
+def _hash(key):
+    return int(hashlib.md5(key.encode('utf-8')).hexdigest()[:16], 16)
+
+
+class HashRing(object):
+    """Consistent hash ring mapping keys to node names.
+
+    Every node is placed on the ring ``replicas`` times. Adding or removing
+    a node only moves the keys between it and its neighbours, about
+    ``1 / len(nodes)`` of all keys.
+
+    :param nodes: the initial node names
+    :type nodes: iterable of str
+    :param replicas: virtual nodes per node, defaults to 160
+    :type replicas: int
+    """
+
+    def __init__(self, nodes=(), replicas=160):
+        self.replicas = replicas
+        self._nodes = set()
+        self._hashes = []
+        self._owners = []
+        for node in nodes:
+            self.add(node)
+
+    @property
+    def nodes(self):
+        """The node names, sorted."""
+        return sorted(self._nodes)
+
+    def add(self, node):
+        """Place a node on the ring."""
+        if node in self._nodes:
+            return
+        self._nodes.add(node)
+        for i in range(self.replicas):
+            point = _hash("%s#%d" % (node, i))
+            index = bisect.bisect(self._hashes, point)
+            self._hashes.insert(index, point)
+            self._owners.insert(index, node)
+
+    def remove(self, node):
+        """Take a node off the ring."""
+        if node not in self._nodes:
+            return
+        self._nodes.discard(node)
+        kept = [(point, owner)
+                for point, owner in zip(self._hashes, self._owners)
+                if owner != node]
+        self._hashes = [point for point, _ in kept]
+        self._owners = [owner for _, owner in kept]
+
+    def get(self, key):
+        """Return the name of the node owning a key.
+
+        :param key: the key
+        :type key: str
+        :rtype: str
+        """
+        if not self._hashes:
+            raise ValueError("The hash ring has no nodes")
+        index = bisect.bisect(self._hashes, _hash(key))
+        if index == len(self._hashes):
+            index = 0
+        return self._owners[index]
+
+
+class ShardedClient(object):
+    """Client for several independent InfluxDB instances, each holding a
+    share of the series.
+
+    Every point is routed by a consistent hash of its shard key: the
+    measurement plus the values of the ``shard_tags``. All points of a
+    series therefore go to the same instance, and adding or removing an
+    instance only moves the series hashed next to it. A write is split into
+    one batch per instance and the batches are sent in parallel.
+
+    :param hosts: the instances, as ``'host:port'`` strings or
+        ``(host, port)`` tuples
+    :type hosts: list
+    :param shard_tags: tag keys that are part of the shard key, defaults
+        to () (shard by measurement only)
+    :type shard_tags: iterable of str
+    :param replicas: virtual nodes per instance on the hash ring, defaults
+        to 160
+    :type replicas: int
+
+    Other keyword arguments are passed to every instance's
+    :class:`~.InfluxDBClient`. ``spool``, ``write_limiter`` and ``schema``
+    belong to a single client, so they are given as functions called with
+    each instance's ``'host:port'`` name to create its own.
+
+    :Example:
+
+    ::
+
+        >> shards = ShardedClient(['influx1:8086', 'influx2:8086'],
+        ..                        shard_tags=['tenant'], database='metrics',
+        ..                        write_limiter=lambda host: WriteLimiter(
+        ..                            points_per_second=50000))
+        >> await shards.write_points(points)
+        >> client = shards.client_for('cpu', {'tenant': 'acme'})
+        >> result = await client.query('SELECT * FROM cpu '
+        ..                             'WHERE tenant = \\'acme\\'')
+    """
+
+    def __init__(self, hosts, shard_tags=(), replicas=160, **kwargs):
+        if not hosts:
+            raise ValueError("At least one host is required")
+        self._shard_tags = tuple(shard_tags)
+        self._client_kwargs = kwargs
+        self._clients = {}
+        self._ring = HashRing(replicas=replicas)
+        self._routes = {}
+        for host in hosts:
+            self.add_host(host)
+
+    @property
+    def hosts(self):
+        """The ``'host:port'`` names of the instances, sorted."""
+        return self._ring.nodes
+
+    def add_host(self, host, client=None):
+        """Add an instance; the series hashed next to it move to it.
+
+        :param host: the instance, as ``'host:port'`` or ``(host, port)``
+        :param client: the client of the instance, defaults to a new
+            :class:`~.InfluxDBClient` created with the constructor's
+            keyword arguments
+        :type client: :class:`~.InfluxDBClient`
+        :raises ValueError: if a ``spool``, ``write_limiter`` or ``schema``
+            keyword argument is an object instead of a function
+        """
+        if isinstance(host, (tuple, list)):
+            host, port = host
+        elif ':' in host:
+            host, port = host.rsplit(':', 1)
+        else:
+            port = 8086
+        name = "%s:%s" % (host, port)
+        if client is None:
+            client = InfluxDBClient(
+                host, port, **_client_kwargs(self._client_kwargs, name))
+        self._clients[name] = client
+        self._ring.add(name)
+        self._routes.clear()
+
+    def remove_host(self, host):
+        """Remove an instance; its series move to the remaining ones.
+
+        :param host: the instance's ``'host:port'`` name
+        :type host: str
+        :returns: the removed instance's client, which is not closed
+        :rtype: :class:`~.InfluxDBClient`
+        """
+        if len(self._clients) == 1 and host in self._clients:
+            raise ValueError("Cannot remove the last host")
+        client = self._clients.pop(host)
+        self._ring.remove(host)
+        self._routes.clear()
+        return client
+
+    def _shard_key(self, measurement, tags):
+        values = [measurement]
+        for key in self._shard_tags:
+            value = tags.get(key) if tags else None
+            values.append(u'' if value is None else u'%s' % value)
+        return u'\x00'.join(values)
+
+    def host_for(self, measurement, tags=None):
+        """Return the name of the instance a series is routed to.
+
+        :param measurement: the series' measurement
+        :type measurement: str
+        :param tags: the series' tags; only the ``shard_tags`` are used
+        :type tags: dict
+        :rtype: str
+        """
+        key = self._shard_key(measurement, tags)
+        host = self._routes.get(key)
+        if host is None:
+            host = self._ring.get(key)
+            if len(self._routes) >= _ROUTE_CACHE_SIZE:
+                self._routes.clear()
+            self._routes[key] = host
+        return host
+
+    def client_for(self, measurement, tags=None):
+        """Return the client of the instance a series is routed to, e.g.
+        to query it.
+
+        :rtype: :class:`~.InfluxDBClient`
+        """
+        return self._clients[self.host_for(measurement, tags)]
+
+    def _line_host(self, line):
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        series = _LINE_SERIES_KEY.match(line).group(0)
+        parts = _LINE_SERIES_PARTS.findall(series)
+        tags = {}
+        for part in parts[1:]:
+            match = _LINE_TAG.match(part)
+            if match:
+                tags[_LINE_UNESCAPE.sub(r'\1', match.group(1))] = \
+                    _LINE_UNESCAPE.sub(r'\1', match.group(2))
+        return self.host_for(_LINE_UNESCAPE.sub(r'\1', parts[0]), tags)
+
+    def _split(self, points, tags, protocol):
+        shards = {}
+        if protocol == 'json':
+            for point in points:
+                point_tags = point.get('tags')
+                if tags:
+                    point_tags = dict(tags, **(point_tags or {}))
+                host = self.host_for(point.get('measurement'), point_tags)
+                shards.setdefault(host, []).append(point)
+        else:
+            if isinstance(points, (bytes, str)):
+                points = points.splitlines()
+            for line in points:
+                if line.strip():
+                    shards.setdefault(self._line_host(line), []).append(line)
+        return shards
+
+    async def write_points(self, points, tags=None, protocol='json',
+                           **kwargs):
+        """Write points, each to the instance its series is routed to.
+
+        Takes the same arguments as :meth:`InfluxDBClient.write_points`.
+        Tags passed with ``tags`` take part in the shard key unless a
+        point has its own value for them.
+
+        :returns: True, if every instance's batch was written
+        :rtype: bool
+        :raises InfluxDBPartialWriteError: if the batches of some
+            instances failed; the other batches are still written. The
+            failures' indexes are positions in :attr:`hosts`
+        """
+        shards = self._split(points, tags, protocol)
+        hosts = self.hosts
+        failures = []
+
+        async def write(host, batch):
+            try:
+                await self._clients[host].write_points(
+                    batch, tags=tags, protocol=protocol, **kwargs)
+            except Exception as e:
+                failures.append((hosts.index(host), batch, e))
+
+        await multi([write(host, batch) for host, batch in shards.items()])
+
+        if failures:
+            failures.sort(key=lambda failure: failure[0])
+            raise InfluxDBPartialWriteError(failures, len(shards))
+        return True
+
+    def stats(self):
+        """Return every instance's :meth:`InfluxDBClient.stats`.
+
+        :rtype: dict of host name to stats
+        """
+        return dict((host, client.stats())
+                    for host, client in self._clients.items())
+
+    def close(self):
+        """Close every instance's client."""
+        for client in self._clients.values():
+            client.close()
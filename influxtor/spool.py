@@ -0,0 +1,314 @@
+# coding:utf-8
+
+import json
+import logging
+import mmap
+import os
+import struct
+import zlib
+
+from tornado.gen import sleep
+from tornado.ioloop import PeriodicCallback
+
+from .exceptions import is_server_failure
+
+
+logger = logging.getLogger(__name__)
+
+_HEADER = struct.Struct('>II')
+_ACTIVE = '.active'
+_SEALED = '.spool'
+
+
+def _read_records(path, offset=0):
+    """Yield ``(end_offset, payload)`` for the intact records of a segment.
+
+    Reading stops at the first torn or corrupt record, which is what a
+    crash during an append leaves behind.
+    """
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size <= offset:
+            return
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            while offset + _HEADER.size <= size:
+                length, crc = _HEADER.unpack_from(data, offset)
+                start = offset + _HEADER.size
+                end = start + length
+                if end > size:
+                    break
+                payload = data[start:end]
+                if zlib.crc32(payload) & 0xffffffff != crc:
+                    break
+                yield end, payload
+                offset = end
+        finally:
+            data.close()
+
+
+class WriteSpool(object):
+    """On-disk spool for writes that could not be sent.
+
+    Encoded line protocol bodies are appended to segment files in
+    ``directory``. The active segment is sealed by an fsync and an atomic
+    rename once it reaches ``segment_size``; only sealed segments are
+    replayed, oldest first, and a segment is deleted once all its records
+    were written. Records are checksummed, so a torn append is detected and
+    skipped. A crash during replay sends the records of the current segment
+    again, which InfluxDB treats as overwrites of the same points. Segments
+    left by a previous run are replayed once the spool is given to a
+    client.
+
+    Pass the spool to :class:`~.InfluxDBClient` with ``spool=``; the client
+    then spools writes failing with server or connection errors, and writes
+    issued while ``max_backlog`` write requests are already in flight.
+
+    :param directory: the directory holding the segment files
+    :type directory: str
+    :param segment_size: size in bytes at which a segment is sealed,
+        defaults to 16 MiB
+    :type segment_size: int
+    :param max_bytes: disk budget; the oldest segments are dropped when it
+        is exceeded, defaults to 1 GiB
+    :type max_bytes: int
+    :param max_backlog: number of in-flight write requests above which new
+        writes go straight to the spool, defaults to None (no limit)
+    :type max_backlog: int
+    :param replay_interval: milliseconds between replay attempts, defaults
+        to 1000
+    :type replay_interval: int
+    :param replay_rate: maximum replay throughput in bytes per second,
+        defaults to None (unlimited)
+    :type replay_rate: int
+    :param fsync: fsync the segment after every append instead of only
+        when it is sealed, defaults to False
+    :type fsync: bool
+
+    :Example:
+
+    ::
+
+        >> spool = WriteSpool('/var/spool/influxtor', replay_rate=1 << 20)
+        >> client = InfluxDBClient(database='metrics', spool=spool)
+        >> await client.write_points(points)  # spooled if InfluxDB is down
+        >> spool.stats()
+    """
+
+    def __init__(self,
+                 directory,
+                 segment_size=16 * 1024 * 1024,
+                 max_bytes=1024 * 1024 * 1024,
+                 max_backlog=None,
+                 replay_interval=1000,
+                 replay_rate=None,
+                 fsync=False):
+        self.directory = directory
+        self.segment_size = segment_size
+        self.max_bytes = max_bytes
+        self.max_backlog = max_backlog
+        self.replay_interval = replay_interval
+        self.replay_rate = replay_rate
+        self._fsync = fsync
+
+        self.spooled_records = 0
+        self.spooled_bytes = 0
+        self.replayed_records = 0
+        self.replayed_bytes = 0
+        self.replay_errors = 0
+        self.rejected_records = 0
+        self.rejected_bytes = 0
+        self.dropped_segments = 0
+        self.dropped_bytes = 0
+
+        self._client = None
+        self._active = None
+        self._active_path = None
+        self._active_size = 0
+        self._replay_path = None
+        self._replay_offset = 0
+        self._replaying = False
+        self._timer = None
+
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        # segments left active by a crash are sealed as they are; replay
+        # ignores a torn record at their end
+        for name in os.listdir(directory):
+            if name.endswith(_ACTIVE):
+                path = os.path.join(directory, name)
+                os.rename(path, path[:-len(_ACTIVE)] + _SEALED)
+        self._segments = sorted(
+            os.path.join(directory, name)
+            for name in os.listdir(directory) if name.endswith(_SEALED))
+        self._bytes = sum(os.path.getsize(path) for path in self._segments)
+        if self._segments:
+            self._sequence = int(
+                os.path.basename(self._segments[-1])[:-len(_SEALED)]) + 1
+        else:
+            self._sequence = 0
+
+    @property
+    def pending_bytes(self):
+        """Size of the spooled data waiting to be replayed."""
+        return self._bytes
+
+    def stats(self):
+        """Return the spool counters.
+
+        :rtype: dict
+        """
+        return {
+            'spooled_records': self.spooled_records,
+            'spooled_bytes': self.spooled_bytes,
+            'replayed_records': self.replayed_records,
+            'replayed_bytes': self.replayed_bytes,
+            'replay_errors': self.replay_errors,
+            'rejected_records': self.rejected_records,
+            'rejected_bytes': self.rejected_bytes,
+            'dropped_segments': self.dropped_segments,
+            'dropped_bytes': self.dropped_bytes,
+            'pending_bytes': self._bytes,
+            'segments': len(self._segments) + (self._active is not None),
+        }
+
+    def attach(self, client):
+        """Set the client used to replay the spooled writes, and start the
+        replay of the segments left by a previous run.
+
+        :raises ValueError: if the spool is attached to another client
+        """
+        if self._client is not None and self._client is not client:
+            raise ValueError("The spool is already attached to another "
+                             "client")
+        self._client = client
+        if self._segments:
+            self.start()
+
+    def start(self):
+        """Start the periodic replay; called when the spool is attached to
+        a client with segments left on disk, and on the first spooled
+        write."""
+        if self._timer is None and self.replay_interval:
+            self._timer = PeriodicCallback(self.replay, self.replay_interval)
+            self._timer.start()
+
+    def stop(self):
+        """Stop the periodic replay and seal the active segment."""
+        if self._timer is not None:
+            self._timer.stop()
+            self._timer = None
+        self._seal()
+
+    def append(self, data, params):
+        """Spool an encoded write.
+
+        :param data: the line protocol body
+        :type data: bytes
+        :param params: the write's query parameters (db, rp, precision)
+        :type params: dict
+        """
+        payload = json.dumps(params or {}).encode('utf-8') + b'\n' + data
+        record = _HEADER.pack(len(payload),
+                              zlib.crc32(payload) & 0xffffffff) + payload
+
+        if self._active is not None and \
+                self._active_size + len(record) > self.segment_size:
+            self._seal()
+        if self._active is None:
+            self._active_path = os.path.join(
+                self.directory, '%020d%s' % (self._sequence, _ACTIVE))
+            self._sequence += 1
+            self._active = open(self._active_path, 'ab')
+            self._active_size = 0
+
+        self._active.write(record)
+        self._active.flush()
+        if self._fsync:
+            os.fsync(self._active.fileno())
+        self._active_size += len(record)
+        self._bytes += len(record)
+        self.spooled_records += 1
+        self.spooled_bytes += len(data)
+
+        while self._bytes > self.max_bytes and self._segments:
+            self._drop_oldest()
+
+        self.start()
+
+    def _seal(self):
+        if self._active is None:
+            return
+        self._active.flush()
+        os.fsync(self._active.fileno())
+        self._active.close()
+        path = self._active_path[:-len(_ACTIVE)] + _SEALED
+        os.rename(self._active_path, path)
+        self._segments.append(path)
+        self._active = None
+        self._active_path = None
+
+    def _drop_oldest(self):
+        path = self._segments.pop(0)
+        size = os.path.getsize(path)
+        os.remove(path)
+        if path == self._replay_path:
+            self._replay_path = None
+            self._replay_offset = 0
+        self._bytes -= size
+        self.dropped_segments += 1
+        self.dropped_bytes += size
+        logger.warning("Spool over %d bytes, dropped %s", self.max_bytes, path)
+
+    async def replay(self):
+        """Write the spooled data to InfluxDB, oldest segment first.
+
+        Stops at the first write failing with a server or connection error
+        and resumes from there on the next call. A record the server
+        rejects (such as a field type conflict or a missing database) would
+        never be accepted, so it is logged, counted and skipped.
+        """
+        if self._replaying or self._client is None:
+            return
+        self._replaying = True
+        try:
+            if not self._segments:
+                # drain the active segment too once the server is back
+                self._seal()
+            while self._segments:
+                path = self._segments[0]
+                if path != self._replay_path:
+                    self._replay_path = path
+                    self._replay_offset = 0
+                for end, payload in _read_records(path, self._replay_offset):
+                    meta, data = payload.split(b'\n', 1)
+                    params = json.loads(meta.decode('utf-8'))
+                    try:
+                        await self._client._send_write(data, params, 204)
+                    except Exception as e:
+                        if is_server_failure(e):
+                            self.replay_errors += 1
+                            logger.warning("Spool replay paused: %s", e)
+                            return
+                        logger.error("Spooled write of %d bytes to %s "
+                                     "rejected, dropping it: %s",
+                                     len(data), params, e)
+                        self.rejected_records += 1
+                        self.rejected_bytes += len(data)
+                    else:
+                        self.replayed_records += 1
+                        self.replayed_bytes += len(data)
+                    if self._replay_path != path:
+                        # dropped while we were writing
+                        break
+                    self._replay_offset = end
+                    if self.replay_rate:
+                        await sleep(float(len(data)) / self.replay_rate)
+                if self._segments and self._segments[0] == path:
+                    self._segments.pop(0)
+                    self._bytes -= os.path.getsize(path)
+                    os.remove(path)
+                self._replay_path = None
+                self._replay_offset = 0
+        finally:
+            self._replaying = False
@@ -0,0 +1,165 @@
+# coding:utf-8
+
+from collections import deque
+
+from influxdb.resultset import ResultSet
+from tornado.gen import convert_yielded
+from tornado.locks import Condition
+
+from .codec import JSONCodec
+from .exceptions import InfluxDBClientError
+
+
+_json = JSONCodec()
+
+
+class QueryStream(object):
+    """Results of a chunked query, read one chunk at a time.
+
+    Incoming data is kept as raw newline-delimited JSON and a chunk is only
+    parsed when it is read, so memory use depends on the chunk size and on
+    how far the reader lags behind the server, not on the result size.
+
+    :Example:
+
+    ::
+
+        >> stream = client.query_stream("SELECT * FROM cpu", chunk_size=10000)
+        >> async for result in stream:
+        ..     process(result.get_points())
+    """
+
+    def __init__(self, raise_errors=True, raw=False):
+        self._raise_errors = raise_errors
+        self._raw = raw
+        self._lines = deque()
+        self._results = deque()
+        self._tail = b''
+        self._done = False
+        self._error = None
+        self._condition = Condition()
+
+    @property
+    def done(self):
+        """True once the response has been fully received and read."""
+        return self._done and not self._lines and not self._results
+
+    def _on_chunk(self, chunk):
+        lines = (self._tail + chunk).split(b'\n')
+        self._tail = lines.pop()
+        self._lines.extend(line for line in lines if line.strip())
+        self._condition.notify_all()
+
+    def _on_response(self, future):
+        try:
+            future.result()
+        except Exception as e:
+            self._error = e
+        if self._tail.strip():
+            self._lines.append(self._tail)
+        self._tail = b''
+        self._done = True
+        self._condition.notify_all()
+
+    def _parse(self, line):
+        data = _json.loads(line)
+        if 'error' in data:
+            raise InfluxDBClientError(data['error'])
+        for result in data.get('results', []):
+            if self._raw:
+                self._results.append(result)
+            else:
+                self._results.append(
+                    ResultSet(result, raise_errors=self._raise_errors))
+
+    async def read(self):
+        """Read the next chunk of results.
+
+        :returns: the next partial result, or None once the stream is
+            exhausted
+        :rtype: :class:`~.ResultSet` (or the raw result dict if the stream
+            was opened with ``raw=True``)
+        """
+        while not self._results:
+            if self._lines:
+                self._parse(self._lines.popleft())
+            elif self._done:
+                if self._error is not None:
+                    error, self._error = self._error, None
+                    raise error
+                return None
+            else:
+                await self._condition.wait()
+        return self._results.popleft()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        result = await self.read()
+        if result is None:
+            raise StopAsyncIteration
+        return result
+
+
+class SplitQueryStream(object):
+    """Results of a query split into time ranges, read one range at a time
+    in time order.
+
+    At most ``max_concurrency`` ranges are queried ahead of the reader.
+
+    :Example:
+
+    ::
+
+        >> stream = client.query_split_stream(
+        ..     'SELECT * FROM cpu', start, end, step=timedelta(days=1))
+        >> async for result in stream:
+        ..     process(result.get_points())
+    """
+
+    def __init__(self, queries, max_concurrency):
+        self._queries = iter(queries)
+        self._max_concurrency = max_concurrency
+        self._pending = deque()
+
+    def _fill(self):
+        while len(self._pending) < self._max_concurrency:
+            try:
+                query = next(self._queries)
+            except StopIteration:
+                return
+            self._pending.append(convert_yielded(query()))
+
+    async def read(self):
+        """Read the result of the next time range.
+
+        :returns: the next range's result, or None once the stream is
+            exhausted
+        :rtype: :class:`~.ResultSet`
+        """
+        self._fill()
+        if not self._pending:
+            return None
+        future = self._pending.popleft()
+        self._fill()
+        try:
+            return await future
+        except Exception:
+            self.cancel()
+            raise
+
+    def cancel(self):
+        """Stop querying the ranges that were not read yet."""
+        self._queries = iter(())
+        while self._pending:
+            self._pending.popleft().cancel()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        result = await self.read()
+        if result is None:
+            raise StopAsyncIteration
+        return result
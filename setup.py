@@ -22,9 +22,7 @@ with open(os.path.join(os.path.dirname(__file__), 'influxtor', '__init__.py')) a
 with open('requirements.txt', 'r') as f:
     requires = [x.strip() for x in f if x.strip()]
 
-print requires
-
-with open('README.rst', 'r') as f:
+with open('README.md', 'r') as f:
     readme = f.read()
 
 
@@ -33,10 +31,12 @@ setup(
     version=version,
     description="Tornado Async InfluxDB client",
     long_description=readme,
+    long_description_content_type='text/markdown',
     url='https://bitbucket.org/geehu/influxtor',
     license='MIT License',
     packages=find_packages(),
     install_requires=requires,
+    python_requires='>=3.6',
     author = "whb",
     author_email = "wanghongbin.whu@gmail.com"
 )